@@ -0,0 +1,45 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from pytouch.tasks import ContactArea
+
+
+def synthetic_frames(n_frames, resolution=(240, 320), seed=0):
+    rng = np.random.default_rng(seed)
+    height, width = resolution
+    base = rng.integers(90, 110, (height, width, 3)).astype(np.uint8)
+    frames = np.repeat(base[None], n_frames, axis=0)
+    for i, frame in enumerate(frames):
+        center = (width // 2 + i % 20, height // 2)
+        cv2.ellipse(frame, center, (40, 25), i % 180, 0, 360, (200, 180, 170), -1)
+    return base, frames
+
+
+def benchmark(n_frames):
+    base, frames = synthetic_frames(n_frames)
+    contact_area = ContactArea(base=base, draw_poly=False, real_time=True)
+
+    start = time.perf_counter()
+    for frame in frames:
+        contact_area(frame)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    contact_area.batch(frames)
+    batch_time = time.perf_counter() - start
+
+    print(f"Frames: {n_frames}, resolution: {frames.shape[1:3]}")
+    print(f"Per-frame loop: {n_frames / loop_time:.1f} frames/sec")
+    print(f"Batched: {n_frames / batch_time:.1f} frames/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ContactArea batch benchmark")
+    parser.add_argument("--frames", type=int, default=512)
+    args = parser.parse_args()
+    benchmark(args.frames)
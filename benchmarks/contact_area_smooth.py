@@ -0,0 +1,31 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import argparse
+import time
+
+import numpy as np
+
+from pytouch.tasks import ContactArea
+
+RESOLUTIONS = {"QVGA": (240, 320), "VGA": (480, 640)}
+
+
+def benchmark(iterations):
+    rng = np.random.default_rng(0)
+    for name, resolution in RESOLUTIONS.items():
+        diff = rng.random(resolution)
+        for method in ContactArea.SMOOTH_METHODS:
+            contact_area = ContactArea(smooth=method)
+            contact_area._smooth(diff)
+            start = time.perf_counter()
+            for _ in range(iterations):
+                contact_area._smooth(diff)
+            latency = (time.perf_counter() - start) / iterations
+            print(f"{name} {resolution}, {method}: {latency * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ContactArea smoothing benchmark")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    benchmark(args.iterations)
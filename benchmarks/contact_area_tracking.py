@@ -0,0 +1,50 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from pytouch.tasks import ContactArea
+
+
+def sustained_contact(n_frames, resolution=(240, 320), seed=0):
+    # small patch drifting slowly across the gel, as in a sustained grasp
+    rng = np.random.default_rng(seed)
+    height, width = resolution
+    base = rng.integers(90, 110, (height, width, 3)).astype(np.uint8)
+    frames = np.repeat(base[None], n_frames, axis=0)
+    for i, frame in enumerate(frames):
+        phase = 2 * np.pi * i / n_frames
+        center = (int(width / 2 + 40 * np.sin(phase)), int(height / 2))
+        cv2.ellipse(frame, center, (40, 25), 30, 0, 360, (200, 180, 170), -1)
+    return base, frames
+
+
+def benchmark(n_frames, margin):
+    for resolution in ((240, 320), (480, 640)):
+        base, frames = sustained_contact(n_frames, resolution)
+        for tracking in (False, True):
+            contact_area = ContactArea(
+                base=base, real_time=True, tracking=tracking, tracking_margin=margin
+            )
+            start = time.perf_counter()
+            for frame in frames:
+                contact_area.contact(frame)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{resolution} tracking={tracking}: "
+                f"{elapsed / n_frames * 1e3:.3f} ms/frame, "
+                f"{contact_area.tracked_frames} tracked frames"
+            )
+            for stage, seconds in contact_area.stage_timings().items():
+                print(f"\t{stage}: {seconds * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ContactArea tracking benchmark")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--margin", type=int, default=16)
+    args = parser.parse_args()
+    benchmark(args.frames, args.margin)
@@ -0,0 +1,70 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import argparse
+import subprocess
+import sys
+
+# backends only loaded when the feature using them is first used
+LAZY_MODULES = ("boto3", "botocore", "onnx", "onnxruntime", "open3d", "scipy")
+# dependencies every pytouch import needs, preloaded to isolate pytouch's own cost
+CORE_MODULES = ("numpy", "cv2", "PIL", "torch", "torchvision")
+
+
+def import_times(statement, preload=()):
+    """
+    Runs statement in a fresh interpreter with -X importtime.
+
+    :param statement: python statement to time, e.g. "import pytouch"
+    :param preload: modules imported before statement, excluded from its timing
+    :return: dict of module to (self, cumulative) microseconds and the names of
+        all modules imported by statement
+    """
+    code = "".join(f"import {module}\n" for module in preload)
+    code += "import sys\nbefore = set(sys.modules)\n"
+    code += f"{statement}\n"
+    code += "print('\\n'.join(sorted(set(sys.modules) - before)))\n"
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = out.stdout.split()
+    times = {}
+    for line in out.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            self_us, cumulative_us, name = line[len("import time:") :].split("|")
+            times[name.strip()] = (int(self_us), int(cumulative_us))
+    # preloaded modules are already cached and only the statement's remain
+    return {name: times[name] for name in modules if name in times}, modules
+
+
+def main(module, repeats, top, budget):
+    totals = []
+    for _ in range(repeats):
+        times, modules = import_times(f"import {module}", preload=CORE_MODULES)
+        totals.append(times[module][1] / 1e3)
+    heavy = sorted({m.split(".")[0] for m in modules} & set(LAZY_MODULES))
+
+    median = sorted(totals)[len(totals) // 2]
+    print(f"import {module} after {', '.join(CORE_MODULES)}")
+    print(f"  best {min(totals):.1f} ms, median {median:.1f} ms")
+    print(f"  heavy modules loaded: {', '.join(heavy) or 'none'}")
+    print(f"Slowest {top} modules by self time:")
+    for name, (self_us, cumulative_us) in sorted(
+        times.items(), key=lambda item: -item[1][0]
+    )[:top]:
+        print(f"  {self_us / 1e3:8.1f} ms {cumulative_us / 1e3:8.1f} ms {name}")
+
+    if budget is not None and min(totals) > budget:
+        sys.exit(f"import {module} took {min(totals):.1f} ms, budget {budget} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="pytouch import time benchmark")
+    parser.add_argument("--module", default="pytouch")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=None, help="ms")
+    args = parser.parse_args()
+    main(args.module, args.repeats, args.top, args.budget)
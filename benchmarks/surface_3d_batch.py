@@ -0,0 +1,86 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import argparse
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+import torch
+
+from pytouch.models import Pix2PixModel
+from pytouch.tasks import Surface3D
+from pytouch.tasks.surface_3d import Surface3DModelDefaults
+
+SENSOR_PARAMS = SimpleNamespace(
+    max_depth=0.0198,
+    remove_background_depth=False,
+    T_cam_offset_sim=[
+        [2.22e-16, 2.22e-16, -1.0, 0.0],
+        [-1.0, 0.0, -2.22e-16, 0.0],
+        [0.0, 1.0, 2.22e-16, 1.5e-02],
+        [0.0, 0.0, 0.0, 1.0],
+    ],
+    P=[
+        [2.30940108, 0.0, 0.0, 0.0],
+        [0.0, 1.73205081, 0.0, 0.0],
+        [0.0, 0.0, -1.04081633, -2.04081633e-03],
+        [0.0, 0.0, -1.0, 0.0],
+    ],
+    z_near=0.001,
+    z_far=0.05,
+    gel_width=0.02,
+    gel_height=0.03,
+)
+
+
+def random_surface_3d(model_dir):
+    """
+    Builds a Surface3D task around a randomly initialised generator so the
+    benchmark does not depend on the model zoo.
+    """
+    defaults = Surface3DModelDefaults
+    model = Pix2PixModel(
+        defaults.name, defaults.model_type, defaults.dataset_mode, defaults.direction
+    )
+    os.makedirs(os.path.join(model_dir, defaults.name), exist_ok=True)
+    torch.save(
+        model.model.netG.state_dict(),
+        os.path.join(model_dir, defaults.name, "latest_net_G.pth"),
+    )
+    return Surface3D("digit", SENSOR_PARAMS, model_path=model_dir)
+
+
+def print_timings(surface_3d):
+    for stage, seconds in surface_3d.stage_timings().items():
+        print(f"  {stage:>16}: {seconds * 1e3:8.2f} ms/frame")
+
+
+def benchmark(n_frames, chunk_size):
+    torch.manual_seed(0)
+    images = torch.rand(n_frames, 3, 240, 320)
+    with tempfile.TemporaryDirectory() as model_dir:
+        surface_3d = random_surface_3d(model_dir)
+
+    surface_3d.reset_timings()
+    start = time.perf_counter()
+    for image in images:
+        surface_3d.point_cloud_3d(image)
+    loop_time = time.perf_counter() - start
+    print(f"Per-frame loop: {n_frames / loop_time:.2f} frames/sec")
+    print_timings(surface_3d)
+
+    surface_3d.reset_timings()
+    start = time.perf_counter()
+    surface_3d.batch_point_clouds(images, chunk_size=chunk_size)
+    batch_time = time.perf_counter() - start
+    print(f"Batched ({chunk_size} per chunk): {n_frames / batch_time:.2f} frames/sec")
+    print_timings(surface_3d)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Surface3D batch benchmark")
+    parser.add_argument("--frames", type=int, default=32)
+    parser.add_argument("--chunk-size", type=int, default=16)
+    args = parser.parse_args()
+    benchmark(args.frames, args.chunk_size)
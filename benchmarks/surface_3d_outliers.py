@@ -0,0 +1,65 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import argparse
+import time
+
+import torch
+
+from pytouch.tasks.surface3d import geometry
+
+
+def synthetic_points_map(rows, cols, n_spikes, seed=0):
+    """
+    Ordered point map of a flat gel with a spherical indentation, sensor noise
+    and a few depth spikes.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    y, x = torch.meshgrid(
+        torch.linspace(-1, 1, rows), torch.linspace(-1, 1, cols), indexing="ij"
+    )
+    z = 0.02 - 0.004 * torch.clamp(1 - (x**2 + y**2) * 4, min=0)
+    z = z + 1e-5 * torch.randn(rows, cols, generator=generator)
+    points_map = torch.stack([x * 0.02, y * 0.03, z])
+    spikes = torch.randint(0, rows * cols, (n_spikes,), generator=generator)
+    points_map.view(3, -1)[2, spikes] += 0.01
+    return points_map
+
+
+def timed(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeats
+
+
+def benchmark(rows, cols, n_spikes, repeats, std_ratio):
+    points_map = synthetic_points_map(rows, cols, n_spikes)
+
+    open3d_pts, open3d_time = timed(
+        lambda: geometry.remove_outlier_pts(
+            points_map.flatten(1), nb_neighbors=20, std_ratio=std_ratio
+        ),
+        repeats,
+    )
+    grid_pts, grid_time = timed(
+        lambda: geometry.remove_outlier_pts_grid(
+            points_map, nb_neighbors=20, std_ratio=std_ratio
+        ),
+        repeats,
+    )
+
+    print(f"Points: {rows * cols}, spikes: {n_spikes}, std ratio: {std_ratio}")
+    print(f"Open3D: {open3d_time * 1e3:.2f} ms, kept {open3d_pts.shape[1]} points")
+    print(f"Grid: {grid_time * 1e3:.2f} ms, kept {grid_pts.shape[1]} points")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Surface3D outlier removal benchmark")
+    parser.add_argument("--rows", type=int, default=160)
+    parser.add_argument("--cols", type=int, default=120)
+    parser.add_argument("--spikes", type=int, default=40)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--std-ratio", type=float, default=2.0)
+    args = parser.parse_args()
+    benchmark(args.rows, args.cols, args.spikes, args.repeats, args.std_ratio)
@@ -0,0 +1,73 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import argparse
+import os
+import tempfile
+import time
+
+import torch
+
+from pytouch.models.touch_detect import TouchDetectModel
+from pytouch.sensors import DigitSensor
+from pytouch.tasks import TouchDetect
+
+
+def export_models(model_dir):
+    model = TouchDetectModel()._model
+    torch_path = os.path.join(model_dir, "touch_detect.pth")
+    onnx_path = os.path.join(model_dir, "touch_detect.onnx")
+    torch.save(model.state_dict(), torch_path)
+    torch.onnx.export(
+        model,
+        torch.randn(1, 3, 64, 64),
+        onnx_path,
+        input_names=["input"],
+        output_names=["output"],
+        dynamic_axes={"input": {0: "batch_size"}, "output": {0: "batch_size"}},
+    )
+    return torch_path, onnx_path
+
+
+def benchmark(iterations, batch_size, num_threads):
+    torch.set_num_threads(num_threads)
+    inputs = torch.randn(batch_size, 3, 64, 64)
+    with tempfile.TemporaryDirectory() as model_dir:
+        torch_path, onnx_path = export_models(model_dir)
+        tasks = {
+            "torch": TouchDetect(DigitSensor, model_path=torch_path),
+            "onnxruntime": TouchDetect(
+                DigitSensor,
+                model_path=onnx_path,
+                backend="onnxruntime",
+                num_threads=num_threads,
+            ),
+        }
+
+    outputs = {}
+    for name, task in tasks.items():
+        task.predict_batch(inputs[:1])
+        start = time.perf_counter()
+        for _ in range(iterations):
+            task.predict_batch(inputs[:1])
+        latency = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            outputs[name] = task.predict_batch(inputs)
+        throughput = iterations * batch_size / (time.perf_counter() - start)
+        print(
+            f"{name}: latency {latency * 1e3:.3f} ms/frame, "
+            f"throughput {throughput:.1f} frames/sec (batch {batch_size})"
+        )
+
+    certainty_diff = abs(outputs["torch"][1] - outputs["onnxruntime"][1]).max()
+    print(f"Max certainty difference between backends: {certainty_diff:.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TouchDetect backend benchmark")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+    benchmark(args.iterations, args.batch_size, args.threads)
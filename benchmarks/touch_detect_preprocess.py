@@ -0,0 +1,63 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+from torchvision import transforms
+
+from pytouch.models.touch_detect import TouchDetectModelDefaults as defaults
+from pytouch.utils.transforms import FastFrameTransform
+
+
+def latency(fn, iterations):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def benchmark(iterations):
+    rng = np.random.default_rng(0)
+    # DIGIT QVGA frame as returned by Digit.get_frame(), BGR and H x W = 320 x 240
+    frame = rng.integers(0, 256, (320, 240, 3), dtype=np.uint8)
+    # default TouchDetect transform chain
+    torchvision_chain = transforms.Compose(
+        [
+            transforms.Resize(defaults.SCALES),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=defaults.MEANS, std=defaults.STDS),
+        ]
+    )
+
+    def torchvision_transform():
+        image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        return torchvision_chain(image)
+
+    results = {"torchvision": latency(torchvision_transform, iterations)}
+    for name, interpolation in (("area", None), ("linear", cv2.INTER_LINEAR)):
+        transform = FastFrameTransform(
+            defaults.SCALES,
+            defaults.MEANS,
+            defaults.STDS,
+            bgr=True,
+            interpolation=interpolation,
+        )
+        # real time callers write into the reusable buffer
+        out = transform.buffer(1)
+        results[f"fast ({name})"] = latency(
+            lambda: transform(frame, out=out), iterations
+        )
+
+    for name, seconds in results.items():
+        print(f"{name}: {seconds * 1e6:.1f} us/frame")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TouchDetect preprocessing benchmark")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    benchmark(args.iterations)
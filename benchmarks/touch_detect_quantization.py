@@ -0,0 +1,122 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import argparse
+import time
+
+import torch
+from torch.utils.data import DataLoader, Subset, TensorDataset
+from torchvision import transforms
+
+from pytouch.datasets.digit import DigitFolder
+from pytouch.models import PyTouchZoo
+from pytouch.models.touch_detect import (
+    QuantizedTouchDetectModel,
+    TouchDetectModel,
+    TouchDetectModelDefaults,
+)
+from pytouch.sensors import DigitSensor
+
+
+def load_data(dataset, batch_size, calibration_batches):
+    """
+    Returns separate calibration and evaluation loaders, so static quantization
+    is not evaluated on the frames it was calibrated with. Both keep a fixed
+    order so every variant is compared on the same samples.
+    """
+    n_calibration = calibration_batches * batch_size
+    if dataset is None:
+        # synthetic inputs only measure latency and agreement with float
+        frames = torch.randn(
+            n_calibration + 8 * batch_size, 3, *TouchDetectModelDefaults.SCALES
+        )
+        samples = TensorDataset(frames, torch.full((len(frames),), -1))
+    else:
+        defaults = TouchDetectModelDefaults
+        transform = transforms.Compose(
+            [
+                transforms.Resize(defaults.SCALES),
+                transforms.ToTensor(),
+                transforms.Normalize(mean=defaults.MEANS, std=defaults.STDS),
+            ]
+        )
+        samples = DigitFolder(dataset, transform=transform)
+        if len(samples) <= n_calibration:
+            raise ValueError(
+                f"Dataset of {len(samples)} frames is too small for "
+                f"{calibration_batches} calibration batches of {batch_size}."
+            )
+    # a seeded permutation so the calibration frames are not all from one class
+    indices = torch.randperm(len(samples), generator=torch.Generator().manual_seed(0))
+    calibration = Subset(samples, indices[:n_calibration].tolist())
+    evaluation = Subset(samples, indices[n_calibration:].tolist())
+    return (
+        DataLoader(calibration, batch_size=batch_size, shuffle=False),
+        DataLoader(evaluation, batch_size=batch_size, shuffle=False),
+    )
+
+
+def evaluate(model, data):
+    predictions, targets = [], []
+    with torch.no_grad():
+        for batch in data:
+            predictions.append(model(batch[0]).argmax(dim=1))
+            targets.append(torch.as_tensor(batch[1]))
+    return torch.cat(predictions), torch.cat(targets)
+
+
+def latency(model, iterations):
+    frame = torch.randn(1, 3, *TouchDetectModelDefaults.SCALES)
+    with torch.no_grad():
+        model(frame)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            model(frame)
+    return (time.perf_counter() - start) / iterations
+
+
+def report(args):
+    torch.set_num_threads(args.threads)
+    if args.model_path is not None:
+        state_dict = PyTouchZoo.load_model(args.model_path)
+    elif args.dataset is not None:
+        state_dict = PyTouchZoo().load_model_from_zoo("touchdetect_resnet", DigitSensor)
+    else:
+        state_dict = TouchDetectModel()._model.state_dict()
+    calibration, data = load_data(
+        args.dataset, args.batch_size, args.calibration_batches
+    )
+
+    static = QuantizedTouchDetectModel(state_dict=state_dict, mode="static")
+    static.calibrate(calibration)
+    models = {
+        "float32": TouchDetectModel(state_dict=state_dict),
+        "dynamic int8": QuantizedTouchDetectModel(
+            state_dict=state_dict, mode="dynamic"
+        ),
+        "static int8": static,
+    }
+
+    reference = None
+    for name, model in models.items():
+        predictions, targets = evaluate(model, data)
+        reference = predictions if reference is None else reference
+        agreement = (predictions == reference).float().mean()
+        accuracy = (predictions == targets).float().mean()
+        line = f"{name}: {latency(model, args.iterations) * 1e3:.3f} ms/frame"
+        line += f", agreement with float32 {agreement:.3f}"
+        if args.dataset is not None:
+            line += f", accuracy {accuracy:.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="TouchDetect int8 quantization accuracy and latency report"
+    )
+    parser.add_argument("--dataset", default=None, help="DigitFolder root")
+    parser.add_argument("--model-path", default=None)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--calibration-batches", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=1)
+    report(parser.parse_args())
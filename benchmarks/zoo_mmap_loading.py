@@ -0,0 +1,85 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import torch
+
+from pytouch.models.touch_detect import TouchDetectModel
+from pytouch.sensors import DigitSensor
+from pytouch.tasks import TouchDetect
+
+
+def memory_kb():
+    """
+    Resident set size and proportional set size of this process in kB. PSS splits
+    shared pages between the processes mapping them, so it shows the sharing.
+    """
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields["Rss"], fields["Pss"]
+
+
+def worker(model_path, mmap, ready, done, results):
+    rss_before, _ = memory_kb()
+    start = time.perf_counter()
+    touch_detect = TouchDetect(
+        DigitSensor, model_path=model_path, mmap=mmap, registry=None
+    )
+    with torch.no_grad():
+        touch_detect.model(torch.zeros(1, 3, 64, 64))
+    startup = time.perf_counter() - start
+    # measure once every worker has loaded, so shared pages are split between them
+    ready.wait()
+    rss, pss = memory_kb()
+    results.put((startup, rss - rss_before, pss))
+    done.wait()
+
+
+def benchmark(n_workers, mmap, model_path):
+    ctx = mp.get_context("spawn")
+    ready = ctx.Barrier(n_workers)
+    done = ctx.Event()
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=worker, args=(model_path, mmap, ready, done, results))
+        for _ in range(n_workers)
+    ]
+    for process in workers:
+        process.start()
+    measurements = [results.get() for _ in workers]
+    done.set()
+    for process in workers:
+        process.join()
+
+    startup = sum(m[0] for m in measurements) / n_workers
+    rss = sum(m[1] for m in measurements) / n_workers / 1024
+    pss = sum(m[2] for m in measurements) / 1024
+    print(
+        f"mmap={mmap}: startup {startup * 1e3:.0f} ms/worker, "
+        f"RSS growth {rss:.1f} MB/worker, total PSS {pss:.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory-mapped zoo model loading")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # spawned workers resolve the same hub directory through TORCH_HOME
+        os.environ["TORCH_HOME"] = tmp
+        model_path = os.path.join(tmp, "touchdetect.pth")
+        torch.save(TouchDetectModel()._model.state_dict(), model_path)
+        # convert once up front, as a provisioning step would
+        TouchDetect(DigitSensor, model_path=model_path, mmap=True, registry=None)
+
+        benchmark(args.workers, False, model_path)
+        benchmark(args.workers, True, model_path)
@@ -16,16 +16,19 @@ def extract_surface_contact():
 
     # initialize with default configuration of ContactArea task
     pt = pytouch.PyTouch(DigitSensor, tasks=[ContactArea])
+    pt.ContactArea.draw_poly = True
     major, minor = pt.ContactArea(sample_img, base=base_img)
 
     print("Major Axis: {0}, minor axis: {1}".format(*major, *minor))
     ImageHandler.save("surface_contact_1.png", sample_img)
 
     # initialize with custom configuration of ContactArea task
-    contact_area = ContactArea(base=base_img, contour_threshold=10)
-    major, minor = contact_area(sample_img_2)
+    contact_area = ContactArea(base=base_img, draw_poly=True, contour_threshold=10)
+    contact = contact_area.contact(sample_img_2)
 
-    print("Major Axis: {0}, minor axis: {1}".format(*major, *minor))
+    print(f"Centroid: {contact.centroid}, area: {contact.area}")
+    print(f"Orientation: {contact.orientation}")
+    print(f"Mean stage timings (s): {contact_area.stage_timings()}")
     ImageHandler.save("surface_contact_2.png", sample_img_2)
 
 
@@ -46,7 +49,7 @@ def extract_surface_contact_real_time():
     while True:
         frame=digit.get_frame()
         img=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) # target image frame for __call__ method
-        contact_area=ContactArea(base=base_img, contour_threshold=10,real_time=True)
+        contact_area=ContactArea(base=base_img, draw_poly=True, contour_threshold=10,real_time=True)
         contact_area(target=img) # __call__ method
         cv2.imshow('surface contact', img)
         k=cv2.waitKey(1)
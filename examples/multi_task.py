@@ -16,6 +16,7 @@ def multi_task():
 
     # initialize with default configuration of ContactArea task
     pt = pytouch.PyTouch(DigitSensor, tasks=[ContactArea, TouchDetect])
+    pt.ContactArea.draw_poly = True
     major, minor = pt.ContactArea(sample_img, base=base_img)
     is_touching = pt.TouchDetect(sample_img)
 
@@ -24,7 +25,7 @@ def multi_task():
     ImageHandler.save("surface_contact_1.png", sample_img)
 
     # initialize with custom configuration of ContactArea and TouchDetect task
-    contact_area = ContactArea(base=base_img, contour_threshold=10)
+    contact_area = ContactArea(base=base_img, draw_poly=True, contour_threshold=10)
     major, minor = contact_area(sample_img_2)
 
     touch_detect = TouchDetect(DigitSensor, zoo_model="touchdetect_resnet18")
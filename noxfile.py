@@ -27,7 +27,7 @@ def tests(session):
     session.install("--upgrade", "setuptools", "pip")
     install_pytouch(session)
     session.install("pytest")
-    session.run("pytest", "tests")
+    session.run("pytest", "tests", "sensors/tests")
 
 
 @nox.session(python=DEFAULT_PYTHON_VERSIONS)
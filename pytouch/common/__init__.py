@@ -1,4 +1,25 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
 
+import importlib
+
 from .constants import SensorDataSources
-from .visualizer import Visualizer3D
+
+# attributes whose modules pull in heavy optional backends, imported on first use
+_LAZY_ATTRS = {
+    "Visualizer3D": ".visualizer",
+    "Visualizer3DOptParams": ".visualizer",
+    "Visualizer3DViewParams": ".visualizer",
+    "Visualizer3DWindowParams": ".visualizer",
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRS))
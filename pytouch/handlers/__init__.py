@@ -1,5 +1,6 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
 
-from .image import ImageHandler
+from .image import ImageFolderHandler, ImageHandler
 from .sensor import SensorHandler
+from .stream import FrameStream, stream_frames
 from .video import VideoHandler
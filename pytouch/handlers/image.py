@@ -1,10 +1,14 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
 
+import os
+
 import cv2
 import numpy as np
 from PIL import Image
 from torchvision import transforms
 
+from .stream import FrameStream
+
 
 class ImageHandler:
     def __init__(self, img_path, convert="RGB"):
@@ -36,3 +40,52 @@ class ImageHandler:
         else:
             # cv2 image
             cv2.imwrite(file_name, img)
+
+
+class ImageFolderHandler:
+    EXTENSIONS = (".bmp", ".jpeg", ".jpg", ".png", ".tif", ".tiff")
+
+    def __init__(self, path, convert="RGB", extensions=EXTENSIONS):
+        self.path = path
+        self.convert = convert
+        self.paths = sorted(
+            os.path.join(path, file_name)
+            for file_name in os.listdir(path)
+            if file_name.lower().endswith(tuple(extensions))
+        )
+        if not self.paths:
+            raise IOError(f"No images found in {path}.")
+        self.current_frame = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def get_frame(self):
+        frame = self._read_frame()
+        if frame is None:
+            raise IOError("No more images in folder.")
+        return frame
+
+    def _read_frame(self):
+        if self.current_frame >= len(self.paths):
+            return None
+        frame = ImageHandler(self.paths[self.current_frame], self.convert).nparray
+        self.current_frame += 1
+        return frame
+
+    def stream(self, policy="block", buffer_size=4, executor=None):
+        """
+        Streams the remaining images in file name order as arrays, like get_frame
+
+        :param policy: backpressure policy, one of FrameStream.POLICIES
+        :param buffer_size: number of images queued
+        :param executor: executor running the reads, a dedicated thread if None
+        :return: FrameStream of image arrays
+        """
+        return FrameStream(
+            self._read_frame,
+            policy=policy,
+            buffer_size=buffer_size,
+            executor=executor,
+            name="ImageFolderHandler",
+        )
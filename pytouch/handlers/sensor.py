@@ -2,6 +2,8 @@
 
 import cv2
 
+from .stream import FrameStream
+
 
 class SensorHandler:
     def __init__(self, cv_device):
@@ -15,6 +17,21 @@ class SensorHandler:
             raise IOError("Could not read next frame.")
         return frame
 
+    def stream(self, policy="drop_oldest", buffer_size=4, executor=None):
+        """
+        :param policy: backpressure policy, one of FrameStream.POLICIES
+        :param buffer_size: number of frames queued
+        :param executor: executor running the reads, a dedicated thread if None
+        :return: FrameStream of sensor frames
+        """
+        return FrameStream(
+            self.get_frame,
+            policy=policy,
+            buffer_size=buffer_size,
+            executor=executor,
+            name="SensorHandler",
+        )
+
     @property
     def dev(self):
         return self.sensor_cap
@@ -0,0 +1,169 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+_log = logging.getLogger(__name__)
+
+# marks the end of the source in the frame queue
+_END = object()
+
+
+class _StreamError:
+    def __init__(self, error):
+        self.error = error
+
+
+class FrameStream:
+    """
+    Asynchronous iterator over a blocking frame source.
+
+    Frames are read by calling read() on an executor, a dedicated single
+    thread one unless given, so the event loop never blocks on the device.
+    Read frames wait in a queue of buffer_size frames until they are consumed;
+    when the consumer falls behind the policy decides what happens:
+
+    - drop_oldest: the oldest queued frame is discarded
+    - block: reading pauses until there is room, no frame is lost
+    - latest_only: only the newest frame is kept
+
+    Reading stops when the ``async for`` loop over the stream ends, including
+    on break or an exception, or when aclose() is called.
+    """
+
+    POLICIES = ("drop_oldest", "block", "latest_only")
+
+    def __init__(
+        self,
+        read,
+        policy="drop_oldest",
+        buffer_size=4,
+        executor=None,
+        name="FrameStream",
+    ):
+        """
+        :param read: blocking callable returning the next frame, None at the end
+        :param policy: backpressure policy, one of POLICIES
+        :param buffer_size: number of frames queued, 1 for latest_only
+        :param executor: executor running read, a dedicated thread if None
+        :param name: name prefix of the dedicated reader thread
+        """
+        if policy not in self.POLICIES:
+            raise NotImplementedError(
+                f"Backpressure policy {policy} is not supported, use one of {self.POLICIES}"
+            )
+        if buffer_size < 1:
+            raise AssertionError("buffer_size must be at least 1")
+        self.read = read
+        self.policy = policy
+        self.buffer_size = 1 if policy == "latest_only" else buffer_size
+        self.name = name
+        self.frames_read = 0
+        self.dropped = 0
+
+        self._executor = executor
+        self._own_executor = executor is None
+        self._queue = None
+        self._task = None
+        self._closed = False
+
+    def _start(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix=self.name)
+        self._queue = asyncio.Queue(self.buffer_size)
+        self._task = asyncio.get_running_loop().create_task(self._produce())
+
+    async def _produce(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                frame = await loop.run_in_executor(self._executor, self.read)
+                if frame is None:
+                    break
+                self.frames_read += 1
+                await self._put(frame)
+            await self._queue.put(_END)
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            _log.debug(f"{self.name} stopped reading: {err}")
+            await self._queue.put(_StreamError(err))
+
+    async def _put(self, frame):
+        if self.policy == "block":
+            await self._queue.put(frame)
+            return
+        while self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(frame)
+
+    async def __aiter__(self):
+        # an async generator is closed by the event loop once the loop over it is
+        # left, so breaking out of a bare async for still stops the reader
+        try:
+            while True:
+                try:
+                    frame = await self.__anext__()
+                except StopAsyncIteration:
+                    return
+                yield frame
+        finally:
+            await self.aclose()
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+        if self._task is None:
+            self._start()
+        item = await self._queue.get()
+        if item is _END:
+            await self.aclose()
+            raise StopAsyncIteration
+        if isinstance(item, _StreamError):
+            await self.aclose()
+            raise item.error
+        return item
+
+    async def aclose(self):
+        """
+        Stops reading and releases the dedicated executor. A read already in
+        progress finishes in the background and its frame is discarded.
+        """
+        self._closed = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+
+def stream_frames(source, policy="drop_oldest", buffer_size=4, executor=None):
+    """
+    Streams frames from any source with a blocking get_frame(), such as a
+    SensorHandler or a pytouch_sensors Digit.
+
+    :param source: object whose get_frame() returns the next frame
+    :param policy: backpressure policy, one of FrameStream.POLICIES
+    :param buffer_size: number of frames queued
+    :param executor: executor running the reads, a dedicated thread if None
+    :return: FrameStream over the source's frames
+    """
+    return FrameStream(
+        source.get_frame,
+        policy=policy,
+        buffer_size=buffer_size,
+        executor=executor,
+        name=type(source).__name__,
+    )
@@ -2,6 +2,8 @@
 
 import cv2
 
+from .stream import FrameStream
+
 
 class VideoHandler:
     def __init__(self, path, resize=None):
@@ -52,14 +54,38 @@ class VideoHandler:
         self.resized_height = height
 
     def get_frame(self):
+        frame = self._read_frame()
+        if frame is None:
+            raise IOError("Could not read next frame.")
+        return frame
+
+    def _read_frame(self):
         ret, frame = self.video_cap.read()
         if not ret:
-            raise IOError("Could not read next frame.")
+            return None
         if self.is_resized:
             frame = cv2.resize(frame, (self.resized_width, self.resized_height))
         self.current_frame = self.video_cap.get(cv2.CAP_PROP_POS_FRAMES)
         return (frame, self.current_frame)
 
+    def stream(self, policy="block", buffer_size=4, executor=None):
+        """
+        Streams the remaining frames as (frame, position) tuples, like get_frame,
+        until the end of the video
+
+        :param policy: backpressure policy, one of FrameStream.POLICIES
+        :param buffer_size: number of frames queued
+        :param executor: executor running the reads, a dedicated thread if None
+        :return: FrameStream of (frame, position) tuples
+        """
+        return FrameStream(
+            self._read_frame,
+            policy=policy,
+            buffer_size=buffer_size,
+            executor=executor,
+            name="VideoHandler",
+        )
+
     def set_frame_pos(self, pos):
         if pos > self.total_frames:
             raise AssertionError(
@@ -1,6 +1,8 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
 
+from .onnx_session import OnnxSessionModel
 from .pix2pix.pix2pix import Pix2PixModel
+from .registry import ModelKey, ModelRegistry, model_registry
 from .slip_detect import SlipDetectModel
-from .touch_detect import TouchDetectModel
+from .touch_detect import QuantizedTouchDetectModel, TouchDetectModel
 from .zoo import PyTouchZoo
@@ -0,0 +1,39 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import numpy as np
+import torch
+
+
+class OnnxSessionModel:
+    """
+    Wraps an onnxruntime InferenceSession so it can be called like the PyTorch
+    task models, taking and returning N x ... tensors. Models exported with a
+    fixed batch dimension are run one fixed size chunk at a time, the last chunk
+    padded to the full size and its output trimmed back.
+    """
+
+    def __init__(self, session, nbytes=0):
+        """
+        :param session: onnxruntime InferenceSession
+        :param nbytes: size of the model weights, used for memory accounting
+        """
+        self.session = session
+        self.nbytes = nbytes
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch_size = model_input.shape[0]
+        self.fixed_batch_size = batch_size if isinstance(batch_size, int) else None
+
+    def __call__(self, input):
+        input_np = input.detach().cpu().numpy()
+        step = self.fixed_batch_size or len(input_np)
+        outputs = []
+        for i in range(0, len(input_np), step):
+            chunk = input_np[i : i + step]
+            n_samples = len(chunk)
+            if n_samples < step:
+                padding = np.zeros((step - n_samples,) + chunk.shape[1:], chunk.dtype)
+                chunk = np.concatenate([chunk, padding])
+            output = self.session.run(None, {self.input_name: chunk})[0]
+            outputs.append(output[:n_samples])
+        return torch.from_numpy(np.concatenate(outputs))
@@ -1,10 +1,14 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
 
+import contextlib
+import functools
+import threading
 from dataclasses import dataclass, field
 from typing import List
 
 import numpy as np
 import torch
+import torch.nn.functional as F
 from PIL import Image
 
 from pytouch.models.pix2pix.thirdparty.pix2pix.data.base_dataset import (
@@ -15,6 +19,7 @@ from pytouch.models.pix2pix.thirdparty.pix2pix.models.pix2pix_model import (
     Pix2PixModel as Pix2PixBaseModel,
 )
 from pytouch.utils.data_utils import interpolate_img
+from pytouch.utils.model_utils import module_nbytes
 
 
 @dataclass
@@ -49,7 +54,7 @@ class Pix2PixModelBaseParams:
     verbose: bool = False
 
     def __post_init__(self):
-        self.gpu_ids = [0] if torch.cuda.is_available() else None
+        self.gpu_ids = [0] if torch.cuda.is_available() else []
 
 
 @dataclass
@@ -78,6 +83,13 @@ class Pix2PixModel:
         self.model = Pix2PixBaseModel(self.model_params)
         if model_dir:
             self.model.setup(self.model_params)
+        # the base model keeps each input and output as attributes, so calls
+        # from threads sharing this model are serialized
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return module_nbytes(self.model.netG)
 
     def init_zoo_model(self, state_dict):
         net = self.model.netG
@@ -93,9 +105,10 @@ class Pix2PixModel:
         model_img_input = self._create_model_input(img)
 
         # call model
-        self.model.set_input(model_img_input)
-        self.model.test()
-        output = self.model.get_current_visuals()
+        with self._lock:
+            self.model.set_input(model_img_input)
+            self.model.test()
+            output = self.model.get_current_visuals()
 
         # post process model output
         img_normal = ((output["fake_B"]).squeeze(0) + 1) / 2.0
@@ -103,6 +116,26 @@ class Pix2PixModel:
 
         return img_normal
 
+    def color_to_normal_batch(self, imgs_input):
+        """
+        Predicts normals for a batch of color images in a single generator pass.
+
+        :param imgs_input: N x C x H x W tensor or sequence of C x H x W tensors
+        :return: N x 3 x 160 x 120 normal images in [0, 1]
+        """
+        imgs = torch.stack([self.preprocess_image(img) for img in imgs_input])
+        model_img_input = self._create_model_input(imgs)
+
+        with self._lock:
+            self.model.set_input(model_img_input)
+            with _per_sample_batch_norm(self.model.netG):
+                self.model.test()
+            output = self.model.get_current_visuals()
+
+        img_normal = (output["fake_B"] + 1) / 2.0
+        img_normal = interpolate_img(img=img_normal.flatten(0, 1), rows=160, cols=120)
+        return img_normal.unflatten(0, (len(imgs), -1))
+
     def preprocess_image(self, img_input):
         img = (
             (img_input * 255.0)
@@ -117,7 +150,8 @@ class Pix2PixModel:
         return img
 
     def _create_model_input(self, img_input):
-        img = img_input.unsqueeze(0)  # B x C x H x W
+        # B x C x H x W
+        img = img_input.unsqueeze(0) if img_input.dim() == 3 else img_input
         model_input = {}
         model_input["A"], model_input["B"] = img, img
         model_input["A_paths"], model_input["B_paths"] = "", ""
@@ -127,3 +161,26 @@ class Pix2PixModel:
         transform_params = get_params(self.model_params, img_input.size)
         transforms = get_transform(self.model_params, transform_params, grayscale=False)
         return transforms(img_input)
+
+
+def _instance_batch_norm(bn, x):
+    return F.instance_norm(x, weight=bn.weight, bias=bn.bias, eps=bn.eps)
+
+
+@contextlib.contextmanager
+def _per_sample_batch_norm(net):
+    """
+    The generator runs with training-mode batch norm at test time, so its
+    statistics depend on the batch. Normalizing each sample on its own keeps
+    batched predictions identical to predicting one frame at a time.
+    """
+    patched = [
+        m for m in net.modules() if isinstance(m, torch.nn.BatchNorm2d) and m.training
+    ]
+    for m in patched:
+        m.forward = functools.partial(_instance_batch_norm, m)
+    try:
+        yield
+    finally:
+        for m in patched:
+            del m.forward
@@ -23,59 +23,88 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
-import copy
 import math
 
 import numpy
-import scipy
-import scipy.fftpack
+
+
+class PoissonSolver:
+    """
+    Poisson reconstruction from gradient fields with the eigenvalue grid
+    cached per image size. Leading axes of the inputs are treated as a batch
+    of independent (H, W) problems that are transformed in a single call.
+    """
+
+    def __init__(self, workers=None):
+        """
+        :param workers: worker threads used by scipy.fft, -1 for all cores
+        """
+        self.workers = workers
+        self._denoms = {}
+
+    def eigenvalues(self, rows, cols):
+        """
+        :return: eigenvalues of the interior Laplacian, (rows - 2, cols - 2)
+        """
+        key = (rows, cols)
+        if key not in self._denoms:
+            h, w = rows - 2, cols - 2
+            y = numpy.arange(1, h + 1)[:, None]
+            x = numpy.arange(1, w + 1)[None, :]
+            self._denoms[key] = (2 * numpy.cos(math.pi * x / (w + 2)) - 2) + (
+                2 * numpy.cos(math.pi * y / (h + 2)) - 2
+            )
+        return self._denoms[key]
+
+    def solve(self, grady, gradx, boundarysrc=None):
+        """
+        :param grady: gradient along rows, (..., H, W)
+        :param gradx: gradient along columns, (..., H, W)
+        :param boundarysrc: image whose border gives the boundary values, zero if None
+        :return: reconstructed image, (..., H, W)
+        """
+        import scipy.fft
+
+        grady = numpy.asarray(grady)
+        gradx = numpy.asarray(gradx)
+
+        # Laplacian
+        f = numpy.zeros(numpy.broadcast_shapes(grady.shape, gradx.shape))
+        f[..., :-1, 1:] += gradx[..., :-1, 1:] - gradx[..., :-1, :-1]
+        f[..., 1:, :-1] += grady[..., 1:, :-1] - grady[..., :-1, :-1]
+        f = f[..., 1:-1, 1:-1]
+
+        # Boundary image, also holds the result
+        if boundarysrc is None:
+            result = numpy.zeros(f.shape[:-2] + (f.shape[-2] + 2, f.shape[-1] + 2))
+        else:
+            result = numpy.array(boundarysrc, dtype=numpy.float64)
+            result[..., 1:-1, 1:-1] = 0
+
+            # Subtract boundary contribution
+            f = f - (
+                result[..., 1:-1, 2:]
+                + result[..., 1:-1, 0:-2]
+                + result[..., 2:, 1:-1]
+                + result[..., 0:-2, 1:-1]
+            )
+
+        # Discrete Sine Transform, divide by eigenvalues and invert
+        axes = (-2, -1)
+        fsin = scipy.fft.dstn(f, axes=axes, norm="ortho", workers=self.workers)
+        fsin /= self.eigenvalues(*result.shape[-2:])
+        img_tt = scipy.fft.idstn(fsin, axes=axes, norm="ortho", workers=self.workers)
+
+        # New center + old boundary
+        result[..., 1:-1, 1:-1] = img_tt
+        return result
+
+
+_default_solver = PoissonSolver()
 
 
 def poisson_reconstruct(grady, gradx, boundarysrc):
     # Thanks to Dr. Ramesh Raskar for providing the original matlab code from which this is derived
     # Dr. Raskar's version is available here: http://web.media.mit.edu/~raskar/photo/code.pdf
-
-    # Laplacian
-    gyy = grady[1:, :-1] - grady[:-1, :-1]
-    gxx = gradx[:-1, 1:] - gradx[:-1, :-1]
-    f = numpy.zeros(boundarysrc.shape)
-    f[:-1, 1:] += gxx
-    f[1:, :-1] += gyy
-
-    # Boundary image
-    boundary = copy.deepcopy(boundarysrc)  # .copy()
-    boundary[1:-1, 1:-1] = 0
-
-    # Subtract boundary contribution
-    f_bp = (
-        -4 * boundary[1:-1, 1:-1]
-        + boundary[1:-1, 2:]
-        + boundary[1:-1, 0:-2]
-        + boundary[2:, 1:-1]
-        + boundary[0:-2, 1:-1]
-    )
-    f = f[1:-1, 1:-1] - f_bp
-
-    # Discrete Sine Transform
-    tt = scipy.fftpack.dst(f, norm="ortho")
-    fsin = scipy.fftpack.dst(tt.T, norm="ortho").T
-
-    # Eigenvalues
-    (x, y) = numpy.meshgrid(
-        range(1, f.shape[1] + 1), range(1, f.shape[0] + 1), copy=True
-    )
-    denom = (2 * numpy.cos(math.pi * x / (f.shape[1] + 2)) - 2) + (
-        2 * numpy.cos(math.pi * y / (f.shape[0] + 2)) - 2
-    )
-
-    f = fsin / denom
-
-    # Inverse Discrete Sine Transform
-    tt = scipy.fftpack.idst(f, norm="ortho")
-    img_tt = scipy.fftpack.idst(tt.T, norm="ortho").T
-
-    # New center + old boundary
-    result = copy.deepcopy(boundary)
-    result[1:-1, 1:-1] = img_tt
-
-    return result
+    # Leading axes, if any, are treated as a batch of independent (H, W) problems.
+    return _default_solver.solve(grady, gradx, boundarysrc)
@@ -0,0 +1,146 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from pytouch.utils.model_utils import module_nbytes
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelKey:
+    zoo_model: str
+    sensor: str
+    version: str = "pth"
+    backend: str = "torch"
+    dtype: str = "float32"
+
+
+@dataclass
+class ModelRegistryStats:
+    models: int
+    nbytes: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class ModelRegistry:
+    """
+    Thread-safe, process-wide cache of loaded task models.
+
+    Tasks built for the same ModelKey share one model instance, so only the
+    first construction loads weights. Models are evicted least recently used
+    first once max_models or max_bytes is exceeded; tasks still holding an
+    evicted model keep it alive, the registry only stops handing it out.
+    """
+
+    def __init__(self, max_models=16, max_bytes=None):
+        """
+        :param max_models: maximum number of cached models, None for no limit
+        :param max_bytes: maximum total size of cached weights, None for no limit
+        """
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._models = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._models
+
+    def __len__(self):
+        with self._lock:
+            return len(self._models)
+
+    def _lookup(self, key):
+        model, _ = self._models[key]
+        self._models.move_to_end(key)
+        self._hits += 1
+        return model
+
+    def get(self, key, factory):
+        """
+        Returns the model cached for key, calling factory() to load it on a miss.
+        Concurrent calls for the same key load the model only once.
+
+        :param key: ModelKey identifying the model
+        :param factory: callable returning the loaded model
+        :return: the shared model
+        """
+        with self._lock:
+            if key in self._models:
+                return self._lookup(key)
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    return self._lookup(key)
+            try:
+                model = factory()
+                nbytes = model_nbytes(model)
+                with self._lock:
+                    self._models[key] = (model, nbytes)
+                    self._misses += 1
+                    self._evict()
+            finally:
+                # a failed load must not leave its lock behind for later callers
+                with self._lock:
+                    self._loading.pop(key, None)
+        _log.debug(f"Loaded {key} into the model registry ({nbytes} bytes)")
+        return model
+
+    def _evict(self):
+        while len(self._models) > 1 and (
+            (self.max_models is not None and len(self._models) > self.max_models)
+            or (self.max_bytes is not None and self._nbytes() > self.max_bytes)
+        ):
+            key, _ = self._models.popitem(last=False)
+            self._evictions += 1
+            _log.debug(f"Evicted {key} from the model registry")
+
+    def _nbytes(self):
+        return sum(nbytes for _, nbytes in self._models.values())
+
+    def evict(self, key):
+        with self._lock:
+            if self._models.pop(key, None) is not None:
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._evictions += len(self._models)
+            self._models.clear()
+
+    def stats(self):
+        with self._lock:
+            return ModelRegistryStats(
+                models=len(self._models),
+                nbytes=self._nbytes(),
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+            )
+
+
+def model_nbytes(model):
+    """
+    Size of a model's weights: its nbytes attribute if it has one, the size of
+    the parameters and buffers for a torch module, otherwise 0.
+    """
+    nbytes = getattr(model, "nbytes", None)
+    if nbytes is not None:
+        return nbytes
+    return module_nbytes(model)
+
+
+# shared by all tasks unless they are given their own registry
+model_registry = ModelRegistry()
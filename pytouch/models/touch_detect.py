@@ -1,7 +1,14 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
 
+import contextlib
+
+import torch
 import torch.nn as nn
+import torch.quantization as quantization
 from torchvision import models
+from torchvision.models import quantization as quantizable_models
+
+from pytouch.utils.model_utils import check_weight_sharing_support, module_nbytes
 
 
 class TouchDetectModelDefaults:
@@ -17,14 +24,27 @@ class TouchDetectModel:
         model=models.resnet18,
         state_dict=None,
         defaults=TouchDetectModelDefaults,
-        **kwargs
+        share_weights=False,
+        **kwargs,
     ):
+        """
+        :param share_weights: Use the state_dict tensors as the model weights rather
+        than copying them, e.g. to keep memory-mapped weights shared between
+        processes. The network is then built without initializing its weights,
+        needs torch>=2.1.
+        """
         super(TouchDetectModel, self).__init__()
         self._model = model
         self.state_dict = state_dict
         self.defaults = defaults
+        self.share_weights = share_weights and state_dict is not None
 
-        self._init_model(model, **kwargs)
+        if self.share_weights:
+            check_weight_sharing_support()
+            with torch.device("meta"):
+                self._init_model(model, **kwargs)
+        else:
+            self._init_model(model, **kwargs)
         if state_dict is not None:
             self._load_state_dict()
         self._model.eval()
@@ -32,6 +52,10 @@ class TouchDetectModel:
     def __call__(self, input):
         return self._model(input)
 
+    @property
+    def nbytes(self):
+        return module_nbytes(self._model)
+
     def _init_model(self, model, **kwargs):
         if self._model.__name__ == "mobilenet_v2":
             self._model = model(**kwargs)
@@ -47,4 +71,90 @@ class TouchDetectModel:
             raise NotImplementedError()
 
     def _load_state_dict(self):
-        self._model.load_state_dict(self.state_dict)
+        if self.share_weights:
+            self._model.load_state_dict(self.state_dict, assign=True)
+        else:
+            self._model.load_state_dict(self.state_dict)
+
+
+class QuantizedTouchDetectModel(TouchDetectModel):
+    """
+    Int8 post-training quantized TouchDetectModel for CPU inference.
+    Dynamic mode quantizes the linear layers weights ahead of time and is ready
+    after construction. Static mode quantizes every layer and must be calibrated
+    with representative frames, e.g. from a DigitFolder, before use.
+    """
+
+    MODES = ("dynamic", "static")
+
+    def __init__(
+        self,
+        model=models.resnet18,
+        state_dict=None,
+        defaults=TouchDetectModelDefaults,
+        mode="static",
+        engine=None,
+        **kwargs,
+    ):
+        if mode not in self.MODES:
+            raise NotImplementedError(f"Unknown quantization mode {mode}.")
+        self.mode = mode
+        self.engine = engine if engine is not None else torch.backends.quantized.engine
+        self.calibrated = False
+        # quantizable torchvision variants share the float models state dict keys
+        quantizable_model = getattr(quantizable_models, model.__name__)
+        super(QuantizedTouchDetectModel, self).__init__(
+            quantizable_model, state_dict=state_dict, defaults=defaults, **kwargs
+        )
+
+        with self._quantized_engine():
+            if mode == "dynamic":
+                self._model = quantization.quantize_dynamic(
+                    self._model, {nn.Linear}, dtype=torch.qint8
+                )
+                self.calibrated = True
+            else:
+                self._model.fuse_model()
+                self._model.qconfig = quantization.get_default_qconfig(self.engine)
+                quantization.prepare(self._model, inplace=True)
+
+    def __call__(self, input):
+        if not self.calibrated:
+            raise AssertionError("Static quantized model must be calibrated first.")
+        with self._quantized_engine():
+            return self._model(input)
+
+    @contextlib.contextmanager
+    def _quantized_engine(self):
+        # the engine is process global, it is only switched while this model
+        # quantizes or runs and restored afterwards
+        previous = torch.backends.quantized.engine
+        if previous == self.engine:
+            yield
+            return
+        torch.backends.quantized.engine = self.engine
+        try:
+            yield
+        finally:
+            torch.backends.quantized.engine = previous
+
+    def calibrate(self, data, num_batches=None):
+        """
+        Collects activation ranges over calibration data and converts the model
+        to int8, only needed in static mode.
+        :param data: Iterable of input batches, or of (input, target, ...) tuples as
+        returned by a DataLoader over a DigitFolder
+        :param num_batches: Number of batches to use, defaults to all
+        :return: None
+        """
+        if self.calibrated:
+            return
+        with torch.no_grad():
+            for i, batch in enumerate(data):
+                if num_batches is not None and i >= num_batches:
+                    break
+                frames = batch[0] if isinstance(batch, (tuple, list)) else batch
+                self._model(frames)
+        with self._quantized_engine():
+            quantization.convert(self._model, inplace=True)
+        self.calibrated = True
@@ -1,20 +1,26 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
 
 import errno
+import hashlib
+import json
+import logging
 import os
+import shutil
 import sys
-from urllib.parse import urljoin, urlparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import quote, unquote, urljoin, urlparse
+from urllib.request import Request, urlopen
+from xml.etree import ElementTree
 
-import boto3
-import botocore
-import onnx
-import onnxruntime
 import torch
 import torch.hub as hub
-from botocore.client import Config
 
 from pytouch.utils import model_utils
 
+_log = logging.getLogger(__name__)
+
 
 class PyTouchZooModelNotFound(Exception):
     """Raised when a PyTouch Zoo model cannot be located"""
@@ -22,11 +28,20 @@ class PyTouchZooModelNotFound(Exception):
     pass
 
 
+class PyTouchZooChecksumError(Exception):
+    """Raised when a downloaded PyTouch Zoo model does not match the zoo listing"""
+
+    pass
+
+
 class ZooConfig:
     SERVICE_NAME = "s3"
     REGION_NAME = "us-east-2"
     BUCKET_NAME = "pytouch-zoo"
-    SIG_VERSION = botocore.UNSIGNED
+    # botocore.UNSIGNED when None, resolved once the S3 client is created
+    SIG_VERSION = None
+    # seconds before the local manifest is refreshed from the zoo
+    MANIFEST_TTL = 24 * 60 * 60
 
     @classmethod
     def generate_download_url(cls, model_file):
@@ -34,32 +49,360 @@ class ZooConfig:
         return urljoin(base_url, model_file)
 
 
+class HttpZooBackend:
+    """
+    Zoo served over HTTP with S3 style ListBucketResult listings, such as a
+    bucket endpoint, a mirror or a local test server.
+    """
+
+    TIMEOUT = 60
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint.rstrip("/") + "/"
+        self.name = "http-" + hashlib.md5(self.endpoint.encode()).hexdigest()[:12]
+
+    def list_objects(self):
+        objects = []
+        marker = ""
+        while True:
+            url = self.endpoint + (f"?marker={quote(marker)}" if marker else "")
+            with urlopen(url, timeout=self.TIMEOUT) as response:
+                listing = ElementTree.parse(response).getroot()
+            fields = {}
+            for element in listing.iter():
+                tag = element.tag.rsplit("}", 1)[-1]
+                if tag in ("Key", "Size", "ETag"):
+                    fields[tag] = element.text
+                if len(fields) == 3:
+                    fields["Size"] = int(fields["Size"])
+                    objects.append(fields)
+                    fields = {}
+            truncated = listing.find("{*}IsTruncated")
+            if truncated is None or truncated.text != "true" or not objects:
+                return objects
+            marker = objects[-1]["Key"]
+
+    def url(self, model_file):
+        return urljoin(self.endpoint, model_file)
+
+    def download(self, model_file, dst, chunk_size=1 << 20):
+        """
+        Downloads into dst, resuming from its current size if it already exists.
+        """
+        offset = os.path.getsize(dst) if os.path.exists(dst) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            response = urlopen(
+                Request(self.url(model_file), headers=headers), timeout=self.TIMEOUT
+            )
+        except HTTPError as e:
+            # nothing left past the offset, the caller verifies the file
+            if offset and e.code == 416:
+                return
+            raise
+        with response:
+            resumed = response.status == 206
+            with open(dst, "ab" if resumed else "wb") as f:
+                shutil.copyfileobj(response, f, chunk_size)
+
+
+class S3ZooBackend(HttpZooBackend):
+    """
+    Zoo stored in an S3 bucket, listed with boto3 and downloaded over HTTP. The
+    client is only created when needed.
+    """
+
+    def __init__(
+        self,
+        service=ZooConfig.SERVICE_NAME,
+        region=ZooConfig.REGION_NAME,
+        bucket=ZooConfig.BUCKET_NAME,
+    ):
+        super(S3ZooBackend, self).__init__(
+            f"http://{bucket}.{service}.{region}.amazonaws.com"
+        )
+        self.service = service
+        self.region = region
+        self.bucket = bucket
+        self.name = f"{service}-{region}-{bucket}"
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            import botocore
+            from botocore.client import Config
+
+            signature_version = ZooConfig.SIG_VERSION or botocore.UNSIGNED
+            self._client = boto3.client(
+                self.service,
+                region_name=self.region,
+                config=Config(signature_version=signature_version),
+            )
+        return self._client
+
+    def list_objects(self):
+        objects = self.client.list_objects(Bucket=self.bucket)["Contents"]
+        return [
+            {"Key": obj["Key"], "Size": obj["Size"], "ETag": obj["ETag"]}
+            for obj in objects
+        ]
+
+
+class LocalZooBackend:
+    """Zoo stored in a local directory, given as a path or a file:// url"""
+
+    def __init__(self, root):
+        if root.startswith("file://"):
+            root = unquote(urlparse(root).path)
+        self.root = os.path.abspath(root)
+        self.name = "local-" + hashlib.md5(self.root.encode()).hexdigest()[:12]
+
+    def list_objects(self):
+        objects = []
+        for key in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, key)
+            if os.path.isfile(path):
+                objects.append(
+                    {
+                        "Key": key,
+                        "Size": os.path.getsize(path),
+                        "ETag": f'"{_file_digest(path, "md5")}"',
+                    }
+                )
+        return objects
+
+    def url(self, model_file):
+        return "file://" + os.path.join(self.root, model_file)
+
+    def download(self, model_file, dst):
+        shutil.copyfile(os.path.join(self.root, model_file), dst)
+
+
+def _key_matches(key, models, sensors, versions):
+    name = os.path.basename(key)
+    stem, _, version = name.rpartition(".")
+    return (
+        (models is None or any(stem.startswith(f"{m}_") for m in models))
+        and (sensors is None or any(stem.endswith(f"_{s}") for s in sensors))
+        and (versions is None or version in versions)
+    )
+
+
+def _file_digest(path, algorithm, chunk_size=1 << 20):
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 class PyTouchZoo:
+    """
+    Resolves and caches models from the PyTouch zoo.
+
+    The bucket listing is kept in a manifest under the torch hub directory and
+    only refreshed once it is older than manifest_ttl seconds. Models already in
+    the hub checkpoint cache are loaded without touching the network, and a
+    stale manifest is used when the zoo cannot be reached. Downloads go to a
+    partial file that is resumed on retry, checked against the listed size and
+    MD5 ETag, and only then moved into the cache.
+    """
+
     def __init__(
         self,
         service=ZooConfig.SERVICE_NAME,
         region=ZooConfig.REGION_NAME,
         bucket=ZooConfig.BUCKET_NAME,
+        source=None,
+        manifest_ttl=ZooConfig.MANIFEST_TTL,
     ):
+        """
+        :param source: http(s):// endpoint, local zoo directory or file:// url
+        used instead of the S3 bucket
+        :param manifest_ttl: maximum age of the manifest in seconds
+        """
         self.service = service
         self.region = region
         self.bucket = bucket
-        self.client = boto3.client(
-            self.service,
-            region_name=self.region,
-            config=Config(signature_version=ZooConfig.SIG_VERSION),
+        if source is None:
+            self.backend = S3ZooBackend(service, region, bucket)
+        elif urlparse(source).scheme in ("http", "https"):
+            self.backend = HttpZooBackend(source)
+        else:
+            self.backend = LocalZooBackend(source)
+        self.manifest_ttl = manifest_ttl
+        self._manifest = None
+
+    @property
+    def checkpoint_dir(self):
+        return os.path.join(hub.get_dir(), "checkpoints")
+
+    @property
+    def manifest_path(self):
+        return os.path.join(hub.get_dir(), "pytouch", f"{self.backend.name}.json")
+
+    @property
+    def objects(self):
+        return self._get_manifest()["objects"]
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, manifest):
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def _get_manifest(self, refresh=True):
+        """
+        :param refresh: fetch a new listing if the manifest is missing or expired
+        :return: manifest dict, None if there is none and refresh is False
+        """
+        if self._manifest is None:
+            self._manifest = self._read_manifest()
+        manifest = self._manifest
+        expired = (
+            manifest is None or time.time() - manifest["updated"] > self.manifest_ttl
         )
-        self.objects = self._get_objects()
+        if refresh and expired:
+            try:
+                manifest = self.refresh_manifest()
+            except Exception as e:
+                if manifest is None:
+                    raise
+                _log.warning(f"Cannot refresh zoo manifest, using cached one: {e}")
+        return manifest
 
-    def _get_objects(self):
-        objects = self.client.list_objects(Bucket=self.bucket)
-        return objects["Contents"]
+    def refresh_manifest(self):
+        self._manifest = {
+            "source": self.backend.url(""),
+            "updated": time.time(),
+            "objects": self.backend.list_objects(),
+        }
+        self._write_manifest(self._manifest)
+        return self._manifest
+
+    def _find_object(self, model_file, refresh=True):
+        manifest = self._get_manifest(refresh=refresh)
+        if manifest is None:
+            return None
+        for obj in manifest["objects"]:
+            if model_file in obj["Key"]:
+                return obj
+        if refresh:
+            raise PyTouchZooModelNotFound(f"cannot find model {model_file}")
+        return None
 
     def _get_zoo_model_url(self, model_name, sensor, version=None):
         model_file = f"{model_name}_{sensor}.{version}"
-        if not any(model_file in obj["Key"] for obj in self.objects):
-            raise PyTouchZooModelNotFound(f"cannot find model {model_file}")
-        return ZooConfig.generate_download_url(model_file)
+        self._find_object(model_file)
+        return self.backend.url(model_file)
+
+    def _cached_model_file(self, model_file, model_dst=None):
+        """
+        Returns the cached model file, downloading it first if it is missing or
+        does not match the size listed in the manifest.
+        """
+        model_dst = self.checkpoint_dir if model_dst is None else model_dst
+        cached_file = os.path.join(model_dst, model_file)
+        if os.path.exists(cached_file):
+            obj = self._find_object(model_file, refresh=False)
+            if obj is None or obj["Size"] == os.path.getsize(cached_file):
+                return cached_file
+            os.remove(cached_file)
+
+        obj = self._find_object(model_file)
+        os.makedirs(model_dst, exist_ok=True)
+        self._fetch(model_file, cached_file, obj)
+        return cached_file
+
+    def _fetch(self, model_file, cached_file, obj):
+        """
+        Downloads model_file to cached_file through a resumable partial file,
+        starting over once if the result does not match the listing.
+        """
+        part_file = f"{cached_file}.part"
+        sys.stderr.write(
+            f"Downloading: {self.backend.url(model_file)} to {cached_file}\n"
+        )
+        for attempt in range(2):
+            self.backend.download(model_file, part_file)
+            try:
+                self._verify(part_file, obj)
+                break
+            except PyTouchZooChecksumError:
+                os.remove(part_file)
+                if attempt:
+                    raise
+        os.replace(part_file, cached_file)
+
+    @staticmethod
+    def _verify(path, obj):
+        size = os.path.getsize(path)
+        if size != obj["Size"]:
+            raise PyTouchZooChecksumError(
+                f"{path} has {size} bytes, expected {obj['Size']}"
+            )
+        # multipart upload ETags are not the MD5 of the content
+        etag = obj.get("ETag", "").strip('"')
+        if etag and "-" not in etag and _file_digest(path, "md5") != etag:
+            raise PyTouchZooChecksumError(f"{path} does not match ETag {etag}")
+
+    def prefetch(
+        self, models=None, sensors=None, versions=None, max_workers=4, verify=True
+    ):
+        """
+        Downloads zoo models into the hub checkpoint cache in parallel, e.g. when
+        provisioning a machine. None selects every model, sensor or version.
+
+        :param models: zoo model names, e.g. ["touchdetect_resnet"]
+        :param sensors: sensor classes or zoo sensor names
+        :param versions: file versions, e.g. ["pth", "onnx"]
+        :param max_workers: maximum number of concurrent downloads
+        :param verify: check the size and ETag of files already in the cache
+        :return: dict of zoo keys to cached files
+        """
+        sensor_names = None
+        if sensors is not None:
+            sensor_names = [s if isinstance(s, str) else s.zoo_name() for s in sensors]
+        objects = [
+            obj
+            for obj in self.objects
+            if _key_matches(obj["Key"], models, sensor_names, versions)
+        ]
+        if not objects:
+            raise PyTouchZooModelNotFound(
+                f"no zoo models for {models}, {sensor_names}, {versions}"
+            )
+
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            paths = pool.map(lambda obj: self._prefetch_object(obj, verify), objects)
+            return dict(zip((obj["Key"] for obj in objects), paths))
+
+    def _prefetch_object(self, obj, verify):
+        cached_file = os.path.join(self.checkpoint_dir, os.path.basename(obj["Key"]))
+        if os.path.exists(cached_file):
+            try:
+                if verify:
+                    self._verify(cached_file, obj)
+                    return cached_file
+                if os.path.getsize(cached_file) == obj["Size"]:
+                    return cached_file
+            except PyTouchZooChecksumError as e:
+                _log.warning(f"Downloading {obj['Key']} again: {e}")
+                # size only checks would accept it again if the download fails
+                os.remove(cached_file)
+        self._fetch(obj["Key"], cached_file, obj)
+        return cached_file
 
     def list_models(self):
         return [obj["Key"] for obj in self.objects]
@@ -67,7 +410,6 @@ class PyTouchZoo:
     def download_model_from_zoo(
         self, model_name, sensor, dst=None, save_local=False, version="pth"
     ):
-        model_url = self._get_zoo_model_url(model_name, sensor.zoo_name(), version)
         model_dst = (
             dst if save_local else os.path.join(hub.get_dir(), "checkpoints", dst)
         )
@@ -76,46 +418,77 @@ class PyTouchZoo:
         except OSError as e:
             if e.errno != errno.EEXIST:
                 raise
-        cached_file = os.path.join(
-            model_dst, f"{model_name}_{sensor.zoo_name()}.{version}"
+        return self._cached_model_file(
+            f"{model_name}_{sensor.zoo_name()}.{version}", model_dst
         )
-        if not os.path.exists(cached_file):
-            sys.stderr.write(f"Downloading: {model_url} to {cached_file}\n")
-            hub.download_url_to_file(model_url, cached_file)
-        return cached_file
-
-    def load_model_from_zoo(self, model_name, sensor, version="pth"):
-        model_url = self._get_zoo_model_url(model_name, sensor.zoo_name(), version)
-        model_state_dict = hub.load_state_dict_from_url(model_url)
-        model_state_dict = model_utils.convert_state_dict_if_from_pl(model_state_dict)
-        return model_state_dict
 
-    def load_onnx_from_zoo(self, model_name, sensor, version="onnx"):
-        model_url = self._get_zoo_model_url(model_name, sensor.name, version)
-        hub_dir = os.path.join(hub.get_dir(), "checkpoints")
+    def model_file(self, model_name, sensor, version="pth"):
+        """
+        :return: path of the cached zoo model file, downloaded if needed
+        """
+        return self._cached_model_file(f"{model_name}_{sensor.zoo_name()}.{version}")
 
-        if not os.path.isfile(hub_dir):
-            os.makedirs(hub_dir)
+    def load_model_from_zoo(self, model_name, sensor, version="pth", mmap=False):
+        cached_file = self.model_file(model_name, sensor, version)
+        return self.load_model(cached_file, mmap=mmap)
 
-        # from https://github.com/pytorch/pytorch/blob/master/torch/hub.py
-        parts = urlparse(model_url)
-        filename = os.path.basename(parts.path)
-        cached_file = os.path.join(hub_dir, filename)
-        if not os.path.exists(cached_file):
-            sys.stderr.write('Downloading: "{}" to {}\n'.format(model_url, cached_file))
-            hub.download_url_to_file(model_url, cached_file, None, progress=True)
-
-        return self.load_onnx_session(cached_file)
+    def load_onnx_from_zoo(self, model_name, sensor, version="onnx", num_threads=None):
+        cached_file = self.model_file(model_name, sensor, version)
+        return self.load_onnx_session(cached_file, num_threads=num_threads)
 
     @staticmethod
-    def load_model(model_path):
+    def load_model(model_path, mmap=False):
+        """
+        :param mmap: load a converted copy of the checkpoint memory-mapped, so its
+        pages are shared read-only by every process loading the same model, needs
+        torch>=2.1
+        """
+        if mmap:
+            model_utils.check_weight_sharing_support()
+            return torch.load(PyTouchZoo.mmap_checkpoint(model_path), mmap=True)
         saved_model = torch.load(model_path)
         saved_model = model_utils.convert_state_dict_if_from_pl(saved_model)
         return saved_model
 
     @staticmethod
-    def load_onnx_session(model_path):
+    def mmap_checkpoint(model_path):
+        """
+        Returns a copy of the checkpoint under the hub directory that can be loaded
+        with torch.load(..., mmap=True): a plain state dict of compact tensors in
+        the zipfile format. The copy is rebuilt when the checkpoint is newer.
+        """
+        model_path = os.path.abspath(model_path)
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        digest = hashlib.sha1(model_path.encode()).hexdigest()[:12]
+        mmap_dir = os.path.join(hub.get_dir(), "checkpoints", "mmap")
+        mmap_file = os.path.join(mmap_dir, f"{name}-{digest}.pt")
+        if os.path.exists(mmap_file) and os.path.getmtime(
+            mmap_file
+        ) >= os.path.getmtime(model_path):
+            return mmap_file
+
+        _log.info(f"Converting {model_path} to {mmap_file}")
+        state_dict = PyTouchZoo.load_model(model_path)
+        state_dict = {k: v.detach().contiguous().clone() for k, v in state_dict.items()}
+        os.makedirs(mmap_dir, exist_ok=True)
+        tmp = f"{mmap_file}.{os.getpid()}.tmp"
+        torch.save(state_dict, tmp)
+        os.replace(tmp, mmap_file)
+        return mmap_file
+
+    @staticmethod
+    def load_onnx_session(model_path, num_threads=None):
+        import onnx
+        import onnxruntime
+
         saved_model = onnx.load(model_path)
         onnx.checker.check_model(saved_model)
-        session = onnxruntime.InferenceSession(saved_model, None)
+        options = onnxruntime.SessionOptions()
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        session = onnxruntime.InferenceSession(
+            saved_model.SerializeToString(),
+            options,
+            providers=onnxruntime.get_available_providers(),
+        )
         return session
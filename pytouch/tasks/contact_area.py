@@ -1,63 +1,382 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
 
 import logging
+import time
+from dataclasses import dataclass
 
 import cv2
 import numpy as np
+import numpy.typing as npt
 
 _log = logging.getLogger(__name__)
 
 
 class ContactArea:
+    @dataclass
+    class ContactAreaReturn:
+        centroid: npt.NDArray
+        # number of pixels inside the contact outline
+        area: float
+        major_axis: npt.NDArray
+        major_axis_end: npt.NDArray
+        minor_axis: npt.NDArray
+        minor_axis_end: npt.NDArray
+        # angle of the major axis to the image x axis in radians, in [-pi/2, pi/2]
+        orientation: float
+        polygon: npt.NDArray
+
+    @dataclass
+    class ContactAreaBatchReturn:
+        major_axis: npt.NDArray
+        major_axis_end: npt.NDArray
+        minor_axis: npt.NDArray
+        minor_axis_end: npt.NDArray
+        no_contact: npt.NDArray
+
+    @dataclass
+    class ContactAreaMultiReturn:
+        centroid: npt.NDArray
+        # fields as in ContactAreaReturn, one row per contact
+        area: npt.NDArray
+        axes: npt.NDArray
+        orientation: npt.NDArray
+        major_axis: npt.NDArray
+        major_axis_end: npt.NDArray
+        minor_axis: npt.NDArray
+        minor_axis_end: npt.NDArray
+
+        def __len__(self):
+            return len(self.area)
+
+    SMOOTH_KERNEL_SIZE = 64
+    ERODE_KERNEL_SIZE = 16
+    SMOOTH_METHODS = ("box", "filter2d")
+    STAGES = ("diff", "smooth", "contours", "fit", "draw")
+
     def __init__(
-        self, base=None, draw_poly=True, contour_threshold=100,real_time=False,*args, **kwargs
+        self,
+        base=None,
+        draw_poly=False,
+        contour_threshold=100,
+        real_time=False,
+        smooth="box",
+        tracking=False,
+        tracking_margin=16,
+        min_contact_area=256,
+        *args,
+        **kwargs
     ):
-        self.base = base
+        if smooth not in self.SMOOTH_METHODS:
+            raise NotImplementedError(f"Unknown smoothing method {smooth}.")
+        self.set_base(base)
         self.draw_poly = draw_poly
         self.contour_threshold = contour_threshold
         self.real_time = real_time
+        self.smooth = smooth
+        self.tracking = tracking
+        self.tracking_margin = tracking_margin
+        self.min_contact_area = min_contact_area
+
+        ksize = self.SMOOTH_KERNEL_SIZE
+        self._smooth_ksize = (ksize, ksize)
+        self._smooth_kernel = np.full(
+            self._smooth_ksize, 1.0 / (ksize * ksize), dtype=np.float32
+        )
+        self._erode_kernel = np.ones(
+            (self.ERODE_KERNEL_SIZE, self.ERODE_KERNEL_SIZE), np.uint8
+        )
+        self.reset_timings()
+        self.reset_tracking()
+
+    @property
+    def base(self):
+        return self._base
+
+    @base.setter
+    def base(self, base):
+        self.set_base(base)
+
+    def set_base(self, base):
+        """
+        Sets the base frame and caches its float32 version used by _diff, the cache
+        is only refreshed when a new base is set.
+        :param base: Base frame, H x W x 3
+        :return: None
+        """
+        self._base = base
+        self._base_f32 = None if base is None else np.asarray(base, dtype=np.float32)
+        self.reset_tracking()
 
     def __call__(self, target, base=None):
+        contact = self.contact(target, base)
+        if contact is None:
+            return None
+        return (
+            (contact.major_axis, contact.major_axis_end),
+            (contact.minor_axis, contact.minor_axis_end),
+        )
+
+    def contact(self, target, base=None):
+        """
+        Computes the contact area of a single frame in one pass.
+        :param target: Frame array, H x W x 3, drawn on in place when draw_poly is set
+        :param base: Base frame, H x W x 3, defaults to the task base
+        :return: ContactAreaReturn, or None when no contact is found in real time mode
+        """
         base = self.base if base is None else base
         if base is None:
             raise AssertionError("A base sample must be specified for Pose.")
+        contact = None
+        if self.tracking and self._track_box is not None:
+            contact = self._scan_region(target, base, self._track_box)
+            self.tracked_frames += contact is not None
+        if contact is None:
+            contact = self._scan(target, base)
+        if self.tracking:
+            self._track_box = None if contact is None else self._track_region(contact)
+
+        start = time.perf_counter()
+        if contact is not None and self.draw_poly:
+            self._draw_major_minor(
+                target,
+                contact.polygon,
+                contact.major_axis,
+                contact.major_axis_end,
+                contact.minor_axis,
+                contact.minor_axis_end,
+            )
+        self._lap("draw", start)
+        self.timed_frames += 1
+
+        if contact is None and not self.real_time:
+            raise Exception("No contact area detected.")
+        return contact
+
+    def reset_tracking(self):
+        self._track_box = None
+        self.tracked_frames = 0
+
+    def reset_timings(self):
+        self.timings = dict.fromkeys(self.STAGES, 0.0)
+        self.timed_frames = 0
+
+    def stage_timings(self):
+        """
+        Returns the mean time in seconds spent per frame in each pipeline stage
+        since the last reset_timings call.
+        """
+        frames = max(self.timed_frames, 1)
+        return {stage: total / frames for stage, total in self.timings.items()}
+
+    def _lap(self, stage, start):
+        now = time.perf_counter()
+        self.timings[stage] += now - start
+        return now
+
+    def _scan(self, target, base):
+        start = time.perf_counter()
         diff = self._diff(target, base)
+        start = self._lap("diff", start)
         diff = self._smooth(diff)
+        start = self._lap("smooth", start)
         contours = self._contours(diff)
-        if self._compute_contact_area(contours, self.contour_threshold) == None and self.real_time==False:
-            raise Exception("No contact area detected.")
-        if self._compute_contact_area(contours, self.contour_threshold) == None and self.real_time==True:
+        start = self._lap("contours", start)
+        contact = self._compute_contact_area(contours, self.contour_threshold)
+        self._lap("fit", start)
+        return contact
+
+    def _track_region(self, contact):
+        # search region for the next frame, the previous ellipse bounds dilated by
+        # the tracking margin
+        x, y, w, h = cv2.boundingRect(contact.polygon)
+        margin = self.tracking_margin
+        return (x - margin, y - margin, x + w + margin, y + h + margin)
+
+    def _scan_region(self, target, base, region):
+        """
+        Runs the pipeline on a crop around the tracked region. The crop is padded by
+        the smoothing and erosion support so the mask inside the region matches a
+        full frame scan. Returns None when the contact is lost or reaches the region
+        border, in which case a full frame scan is needed.
+        """
+        height, width = target.shape[:2]
+        x0, y0 = max(region[0], 0), max(region[1], 0)
+        x1, y1 = min(region[2], width), min(region[3], height)
+        if x0 >= x1 or y0 >= y1:
             return None
-        else:
-            (
-                poly,
-                major_axis,
-                major_axis_end,
-                minor_axis,
-                minor_axis_end,
-            ) = self._compute_contact_area(contours, self.contour_threshold)
+        pad = self.SMOOTH_KERNEL_SIZE // 2 + self.ERODE_KERNEL_SIZE // 2
+        cx0, cy0 = max(x0 - pad, 0), max(y0 - pad, 0)
+        cx1, cy1 = min(x1 + pad, width), min(y1 + pad, height)
+        if base is self._base:
+            base = self._base_f32
+
+        start = time.perf_counter()
+        diff = self._diff(target[cy0:cy1, cx0:cx1], base[cy0:cy1, cx0:cx1])
+        start = self._lap("diff", start)
+        diff = self._smooth(diff)
+        start = self._lap("smooth", start)
+        mask = self._mask(diff)[y0 - cy0 : y1 - cy0, x0 - cx0 : x1 - cx0]
+        # a contact crossing the region border inside the image has moved or grown
+        # beyond the tracked area
+        borders = (
+            (y0 > 0, mask[0]),
+            (y1 < height, mask[-1]),
+            (x0 > 0, mask[:, 0]),
+            (x1 < width, mask[:, -1]),
+        )
+        if any(inside and border.any() for inside, border in borders):
+            self._lap("contours", start)
+            return None
+        contours, _ = cv2.findContours(
+            np.ascontiguousarray(mask),
+            cv2.RETR_LIST,
+            cv2.CHAIN_APPROX_SIMPLE,
+            offset=(x0, y0),
+        )
+        start = self._lap("contours", start)
+        contact = self._compute_contact_area(contours, self.contour_threshold)
+        self._lap("fit", start)
+        return contact
+
+    def contacts(self, target, base=None):
+        """
+        Computes every contact region of a single frame.
+        :param target: Frame array, H x W x 3, drawn on in place when draw_poly is set
+        :param base: Base frame, H x W x 3, defaults to the task base
+        :return: ContactAreaMultiReturn with one ellipse per region of at least
+        min_contact_area pixels, sorted by decreasing area
+        """
+        base = self.base if base is None else base
+        if base is None:
+            raise AssertionError("A base sample must be specified for Pose.")
+        start = time.perf_counter()
+        diff = self._diff(target, base)
+        start = self._lap("diff", start)
+        diff = self._smooth(diff)
+        start = self._lap("smooth", start)
+        mask = self._mask(diff)
+        start = self._lap("contours", start)
+        contacts = self._compute_contacts(mask, self.min_contact_area)
+        start = self._lap("fit", start)
         if self.draw_poly:
-            self._draw_major_minor(
-                target, poly, major_axis, major_axis_end, minor_axis, minor_axis_end
+            for i in range(len(contacts)):
+                poly = cv2.ellipse2Poly(
+                    tuple(int(c) for c in contacts.centroid[i]),
+                    tuple(int(r) for r in contacts.axes[i]),
+                    int(np.degrees(contacts.orientation[i])),
+                    0,
+                    360,
+                    5,
+                )
+                self._draw_major_minor(
+                    target,
+                    poly,
+                    contacts.major_axis[i],
+                    contacts.major_axis_end[i],
+                    contacts.minor_axis[i],
+                    contacts.minor_axis_end[i],
+                )
+        self._lap("draw", start)
+        self.timed_frames += 1
+        return contacts
+
+    def batch(self, targets, base=None):
+        """
+        Computes the contact area for a stack of frames.
+        :param targets: Frames array, N x H x W x 3
+        :param base: Base frame, H x W x 3, defaults to the task base
+        :return: ContactAreaBatchReturn with N x 2 axis arrays, NaN where no contact
+        was detected, and the N per-frame no contact mask
+        """
+        base = self.base if base is None else base
+        if base is None:
+            raise AssertionError("A base sample must be specified for Pose.")
+        targets = np.asarray(targets)
+        if targets.ndim != 4:
+            raise ValueError("Batched targets must be of shape N x H x W x C.")
+
+        n_frames = targets.shape[0]
+        axes = np.full((4, n_frames, 2), np.nan)
+        no_contact = np.ones(n_frames, dtype=bool)
+        # scratch buffers reused by every frame, the difference is smoothed in place
+        shape = targets.shape[1:]
+        if targets.dtype == np.asarray(base).dtype == np.uint8:
+            diff_into = self._diff_uint8
+            out = (np.empty(shape, np.uint8), np.empty(shape, np.float32))
+        else:
+            diff_into = self._diff
+            out = (np.empty(shape, np.float32), np.empty(shape, np.float32))
+        out += (np.empty(shape[:2], np.float32),)
+        for i, target in enumerate(targets):
+            diff = diff_into(target, base, out)
+            contours = self._contours(self._smooth(diff, dst=diff))
+            contact = self._compute_contact_area(contours, self.contour_threshold)
+            if contact is None:
+                continue
+            axes[:, i] = (
+                contact.major_axis,
+                contact.major_axis_end,
+                contact.minor_axis,
+                contact.minor_axis_end,
             )
-        return (major_axis, major_axis_end), (minor_axis, minor_axis_end)
+            no_contact[i] = False
+        return self.ContactAreaBatchReturn(*axes, no_contact)
 
-    def _diff(self, target, base):
-        diff = (target * 1.0 - base) / 255.0 + 0.5
-        diff[diff < 0.5] = (diff[diff < 0.5] - 0.5) * 0.7 + 0.5
-        diff_abs = np.mean(np.abs(diff - 0.5), axis=-1)
+    def _diff(self, target, base, out=None):
+        # mean over channels of |d| / 255 where negative differences are weighted by
+        # 0.7, written as 0.85 * |d| + 0.15 * d to avoid masked temporaries
+        if base is self._base and base is not None:
+            base = self._base_f32
+        if out is None:
+            diff = np.subtract(target, base, dtype=np.float32)
+            weighted = np.abs(diff)
+            diff_abs = None
+        else:
+            diff, weighted, diff_abs = out
+            np.subtract(target, base, out=diff, dtype=np.float32)
+            np.abs(diff, out=weighted)
+        diff *= np.float32(0.15 / 0.85)
+        weighted += diff
+        if diff_abs is None:
+            diff_abs = weighted[..., 0].copy()
+        else:
+            np.copyto(diff_abs, weighted[..., 0])
+        for channel in range(1, weighted.shape[-1]):
+            diff_abs += weighted[..., channel]
+        diff_abs *= np.float32(0.85 / (255.0 * weighted.shape[-1]))
         return diff_abs
 
-    def _smooth(self, target):
-        kernel = np.ones((64, 64), np.float32)
-        kernel /= kernel.sum()
-        diff_blur = cv2.filter2D(target, -1, kernel)
-        return diff_blur
+    def _diff_uint8(self, target, base, out):
+        """
+        _diff for uint8 frames with OpenCV kernels writing into out, a H x W x C
+        uint8, H x W x C float32 and H x W float32 buffer. Saturating subtractions
+        split the difference into its positive and negative parts, which are
+        weighted and summed over channels without float temporaries.
+        """
+        negative, weighted, diff_abs = out
+        channels = target.shape[-1]
+        positive = cv2.subtract(target, base)
+        cv2.subtract(base, target, dst=negative)
+        scale = 1.0 / (255.0 * channels)
+        cv2.addWeighted(
+            positive, scale, negative, 0.7 * scale, 0, dst=weighted, dtype=cv2.CV_32F
+        )
+        cv2.transform(weighted, np.ones((1, channels), np.float32), dst=diff_abs)
+        return diff_abs
 
-    def _contours(self, target):
+    def _smooth(self, target, dst=None):
+        # the normalized box filter uses running sums, O(1) per pixel regardless of
+        # the kernel size, and matches the dense filter2D averaging kernel
+        if self.smooth == "filter2d":
+            return cv2.filter2D(target, -1, self._smooth_kernel, dst=dst)
+        return cv2.boxFilter(target, -1, self._smooth_ksize, dst=dst)
+
+    def _mask(self, target):
         mask = ((np.abs(target) > 0.04) * 255).astype(np.uint8)
-        kernel = np.ones((16, 16), np.uint8)
-        mask = cv2.erode(mask, kernel)
+        return cv2.erode(mask, self._erode_kernel)
+
+    def _contours(self, target):
+        mask = self._mask(target)
         contours, _ = cv2.findContours(mask, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
         return contours
 
@@ -87,6 +406,63 @@ class ContactArea:
             lineThickness,
         )
 
+    def _compute_contacts(self, mask, min_area):
+        """
+        Fits an ellipse to every connected region of the mask from its image
+        moments. The moments of all regions are accumulated at once with bincount
+        over the foreground pixels, so the cost does not grow with the number of
+        regions.
+        """
+        n_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(
+            mask, connectivity=8
+        )
+        foreground = np.flatnonzero(labels)
+        labels = labels.ravel()[foreground]
+        ys, xs = np.divmod(foreground, mask.shape[1])
+        xs, ys = xs.astype(np.float64), ys.astype(np.float64)
+        m00 = stats[:, cv2.CC_STAT_AREA].astype(np.float64)
+        mu20 = np.bincount(labels, xs * xs, n_labels) / m00 - centroids[:, 0] ** 2
+        mu02 = np.bincount(labels, ys * ys, n_labels) / m00 - centroids[:, 1] ** 2
+        mu11 = (
+            np.bincount(labels, xs * ys, n_labels) / m00
+            - centroids[:, 0] * centroids[:, 1]
+        )
+
+        # label 0 is the background
+        keep = np.flatnonzero(m00[1:] >= min_area) + 1
+        keep = keep[np.argsort(-m00[keep], kind="stable")]
+        mu20, mu02, mu11 = mu20[keep], mu02[keep], mu11[keep]
+        center = centroids[keep]
+
+        # eigenvalues of the covariance give the axes, a uniform ellipse with semi
+        # axis r has a variance of r^2 / 4 along that axis
+        spread = np.sqrt(((mu20 - mu02) / 2) ** 2 + mu11 ** 2)
+        mean = (mu20 + mu02) / 2
+        axes = 2 * np.sqrt(np.stack([mean + spread, np.maximum(mean - spread, 0)], 1))
+        theta = 0.5 * np.arctan2(2 * mu11, mu20 - mu02)
+        direction = np.stack([np.cos(theta), np.sin(theta)], axis=1)
+        normal = np.stack([-np.sin(theta), np.cos(theta)], axis=1)
+        major_axis = center + axes[:, :1] * direction
+        minor_axis = center + axes[:, 1:] * normal
+        return self.ContactAreaMultiReturn(
+            centroid=center,
+            area=m00[keep],
+            axes=axes,
+            orientation=theta,
+            major_axis=major_axis,
+            major_axis_end=2 * center - major_axis,
+            minor_axis=minor_axis,
+            minor_axis_end=2 * center - minor_axis,
+        )
+
+    @staticmethod
+    def _contour_pixels(contour):
+        # pixel count of the filled contour, the region area that contacts() reports
+        x, y, w, h = cv2.boundingRect(contour)
+        region = np.zeros((h, w), np.uint8)
+        cv2.drawContours(region, [contour], -1, 255, cv2.FILLED, offset=(-x, -y))
+        return float(cv2.countNonZero(region))
+
     def _compute_contact_area(self, contours, contour_threshold):
         for contour in contours:
             if len(contour) > contour_threshold:
@@ -110,4 +486,15 @@ class ContactArea:
                 )
                 major_axis_end = 2 * center - major_axis
                 minor_axis_end = 2 * center - minor_axis
-                return poly, major_axis, major_axis_end, minor_axis, minor_axis_end
+                # the fitEllipse angle is the one of the minor axis
+                return self.ContactAreaReturn(
+                    centroid=center,
+                    area=self._contour_pixels(contour),
+                    major_axis=major_axis,
+                    major_axis_end=major_axis_end,
+                    minor_axis=minor_axis,
+                    minor_axis_end=minor_axis_end,
+                    orientation=theta - np.pi / 2,
+                    polygon=poly,
+                )
+        return None
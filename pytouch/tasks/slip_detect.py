@@ -2,16 +2,59 @@
 
 import logging
 
+import torch
+import torch.nn as nn
 from torchvision import transforms
 
+from ..models import OnnxSessionModel, PyTouchZoo, SlipDetectModel
 from ..utils.transforms import TemporalDownSample
 
 _log = logging.getLogger(__name__)
 
 
 class SlipDetect:
-    def __init__(self, transform_data_cfg, checkpoint_path):
-        pass
+    def __init__(
+        self,
+        transform_data_cfg=None,
+        checkpoint_path=None,
+        backend="torch",
+        num_threads=None,
+    ):
+        self.transform_data_cfg = transform_data_cfg
+        self.checkpoint_path = checkpoint_path
+        self.backend = backend
+        self.model = None
+
+        if checkpoint_path is None:
+            return
+        if backend == "onnxruntime":
+            session = PyTouchZoo.load_onnx_session(checkpoint_path, num_threads)
+            self.model = OnnxSessionModel(session)
+        elif backend == "torch":
+            state_dict = PyTouchZoo.load_model(checkpoint_path)
+            self.model = SlipDetectModel(state_dict=state_dict)
+        else:
+            raise NotImplementedError(f"Unknown inference backend {backend}.")
+
+    def __call__(self, frames_t):
+        return self.predict(frames_t)
+
+    def predict(self, frames_t):
+        """
+        Runs slip detection on preprocessed clips of T frames each.
+        :param frames_t: N x C x T x H x W batch of clips, or a single C x T x H x W clip
+        :return: Tuple of N predictions and N certainties arrays
+        """
+        if self.model is None:
+            raise AssertionError("A checkpoint must be specified for SlipDetect.")
+        if frames_t.dim() == 4:
+            frames_t = frames_t.unsqueeze(0)
+        if frames_t.dim() != 5:
+            raise ValueError("Slip detection input must be of shape N x C x T x H x W.")
+        with torch.no_grad():
+            output = self.model(frames_t)
+        certainty, prediction = nn.functional.softmax(output, dim=1).max(dim=1)
+        return prediction.cpu().numpy(), certainty.cpu().numpy()
 
     @staticmethod
     def transform(data_cfg, train=False):
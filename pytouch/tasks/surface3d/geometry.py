@@ -1,14 +1,18 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
 
 import copy
+import math
 
 import numpy as np
-import open3d as o3d
 import torch
+import torch.nn.functional as F
 
 from pytouch.models.pix2pix.thirdparty import poisson
+from pytouch.tasks.surface3d.poisson import TorchPoissonSolver
 from pytouch.utils.common_utils import max_clip
 
+_poisson_solver = TorchPoissonSolver()
+
 
 def mask_background(x, bg_mask, bg_val=0.0):
     if bg_mask is not None:
@@ -18,19 +22,19 @@ def mask_background(x, bg_mask, bg_val=0.0):
 
 def preproc_normal(img_normal, bg_mask=None):
     """
-    img_normal: lies in range [0, 1]
+    img_normal: lies in range [0, 1], (3, H, W) or (N, 3, H, W)
     """
 
     # 0.5 corresponds to 0
     img_normal = img_normal - 0.5
 
     # normalize
-    img_normal = img_normal / torch.linalg.norm(img_normal, dim=0)
+    img_normal = img_normal / torch.linalg.norm(img_normal, dim=-3, keepdim=True)
 
     # set background to have only z normals (flat, facing camera)
     if bg_mask is not None:
-        img_normal[0:2, bg_mask] = 0.0
-        img_normal[2, bg_mask] = 1.0
+        flat = img_normal.new_tensor([0.0, 0.0, 1.0]).view(3, 1, 1)
+        img_normal = torch.where(bg_mask.unsqueeze(-3), flat, img_normal)
 
     return img_normal
 
@@ -39,10 +43,10 @@ def normal_to_grad_depth(img_normal, gel_width=1.0, gel_height=1.0, bg_mask=None
     # Ref: https://stackoverflow.com/questions/34644101/calculate-surface-normals-from-depth-image-using-neighboring-pixels-cross-produc/34644939#34644939 # noqa: E501
 
     EPS = 1e-1
-    nz = torch.max(torch.tensor(EPS), img_normal[2, :])
+    nz = torch.clamp(img_normal[..., 2, :, :], min=EPS)
 
-    dzdx = -(img_normal[0, :] / nz).squeeze()
-    dzdy = -(img_normal[1, :] / nz).squeeze()
+    dzdx = -(img_normal[..., 0, :, :] / nz)
+    dzdy = -(img_normal[..., 1, :, :] / nz)
 
     # taking out negative sign as we are computing gradient of depth not z
     # since z is pointed towards sensor, increase in z corresponds to decrease in depth
@@ -58,7 +62,7 @@ def normal_to_grad_depth(img_normal, gel_width=1.0, gel_height=1.0, bg_mask=None
     grady = ddepthdv  # rows
 
     # convert units from pixel to meters
-    C, H, W = img_normal.shape
+    H, W = img_normal.shape[-2:]
     gradx = gradx * (gel_width / W)
     grady = grady * (gel_height / H)
 
@@ -69,23 +73,30 @@ def normal_to_grad_depth(img_normal, gel_width=1.0, gel_height=1.0, bg_mask=None
     return gradx, grady
 
 
-def integrate_grad_depth(gradx, grady, boundary=None, bg_mask=None, max_depth=0.0):
-    if boundary is None:
-        boundary = torch.zeros((gradx.shape[0], gradx.shape[1]))
-
-    img_depth_recon = poisson.poisson_reconstruct(
-        grady.cpu().detach().numpy(),
-        gradx.cpu().detach().numpy(),
-        boundary.cpu().detach().numpy(),
-    )
-    img_depth_recon = torch.FloatTensor(img_depth_recon, device=gradx.device)
+def integrate_grad_depth(
+    gradx, grady, boundary=None, bg_mask=None, max_depth=0.0, solver=None
+):
+    solver = _poisson_solver if solver is None else solver
+    if isinstance(solver, poisson.PoissonSolver):
+        img_depth_recon = solver.solve(
+            grady.cpu().detach().numpy(),
+            gradx.cpu().detach().numpy(),
+            None if boundary is None else boundary.cpu().detach().numpy(),
+        )
+        img_depth_recon = torch.from_numpy(img_depth_recon).to(
+            device=gradx.device, dtype=torch.float32
+        )
+    else:
+        img_depth_recon = solver.solve(grady, gradx, boundary)
 
     if bg_mask is not None:
         img_depth_recon = mask_background(img_depth_recon, bg_mask)
 
     # after integration, img_depth_recon lies between 0. (bdry) and a -ve val (obj depth)
     # rescale to make max depth as gel depth and obj depth as +ve values
-    img_depth_recon = max_clip(img_depth_recon, max_val=torch.tensor(0.0)) + max_depth
+    img_depth_recon = (
+        max_clip(img_depth_recon, max_val=img_depth_recon.new_tensor(0.0)) + max_depth
+    )
 
     return img_depth_recon
 
@@ -187,6 +198,72 @@ def _object_to_world(obj_pos, M):
     return world_pos
 
 
+class Projector:
+    """
+    Unprojects depth maps of a fixed size to 3D world points.
+
+    The NDC pixel grid and the combined inverse of the projection and view
+    transforms are computed once, so each frame costs a single fused
+    multiply-add over the grid followed by the homogeneous divide.
+    """
+
+    def __init__(self, rows, cols, P, V, params, device=None, dtype=torch.float32):
+        """
+        :param rows: depth map height
+        :param cols: depth map width
+        :param P: projection matrix, (4, 4)
+        :param V: view matrix, (4, 4)
+        :param params: sensor params providing z_near and z_far
+        """
+        P = torch.as_tensor(P, dtype=torch.float64, device=device)
+        V = torch.as_tensor(V, dtype=torch.float64, device=device)
+        assert P.shape == (4, 4)
+        assert V.shape == (4, 4)
+        self.rows, self.cols = rows, cols
+
+        f = params.z_far
+        n = params.z_near
+        # clip = depth * (x_ndc, y_ndc, a, 1) + (0, 0, b, 0)
+        a = (f + n) / (f - n)
+        b = -2 * f * n / (f - n)
+
+        y_ndc, x_ndc = torch.meshgrid(
+            torch.linspace(-1, 1, rows, dtype=torch.float64, device=device),
+            torch.linspace(-1, 1, cols, dtype=torch.float64, device=device),
+            indexing="ij",
+        )
+        ndc = torch.stack(
+            [x_ndc.reshape(-1), y_ndc.reshape(-1)]
+            + [torch.full_like(x_ndc.reshape(-1), v) for v in (a, 1.0)]
+        )  # 4 x N
+
+        world_from_clip = torch.inverse(V) @ torch.inverse(P)
+        self.grid = (world_from_clip @ ndc).to(dtype)
+        self.offset = (b * world_from_clip[:, 2:3]).to(dtype)
+
+    def __call__(self, depth, ordered_pts=False):
+        return self.unproject(depth, ordered_pts)
+
+    def unproject(self, depth, ordered_pts=False):
+        """
+        :param depth: depth map, (..., H, W)
+        :return: world_pos position in 3d world coordinates, (..., 3, H, W) or (..., 3, N)
+        """
+        if depth.shape[-2:] != (self.rows, self.cols):
+            raise ValueError(
+                f"Expected depth of size {(self.rows, self.cols)}, "
+                f"got {tuple(depth.shape[-2:])}."
+            )
+        depth = depth.flatten(-2).unsqueeze(-2)
+        world_pos = torch.addcmul(self.offset, self.grid, depth)
+        world_pos = world_pos[..., 0:3, :] / world_pos[..., 3:4, :]
+
+        if ordered_pts:
+            world_pos = world_pos.unflatten(-1, (self.rows, self.cols))
+
+        return world_pos
+
+
 def depth_to_pts3d(depth, P, V, params=None, ordered_pts=False):
     """
     :param depth: depth map, (C, H, W) or (H, W)
@@ -195,24 +272,71 @@ def depth_to_pts3d(depth, P, V, params=None, ordered_pts=False):
     :return: world_pos position in 3d world coordinates, (3, H, W) or (3, N)
     """
     assert 2 <= len(depth.shape) <= 3
-    assert P.shape == (4, 4)
-    assert V.shape == (4, 4)
 
     depth_map = depth.squeeze(0) if (len(depth.shape) == 3) else depth
     H, W = depth_map.shape
-    pixel_pos = _vectorize_pixel_coords(rows=H, cols=W)
-
-    clip_pos = _pixel_to_clip(pixel_pos, depth_map, params)
-    eye_pos = _clip_to_eye(clip_pos, P)
-    world_pos = _eye_to_world(eye_pos, V)
-
-    world_pos = world_pos[0:3, :] / world_pos[3, :]
+    projector = Projector(
+        H, W, P, V, params, device=depth_map.device, dtype=depth_map.dtype
+    )
+    return projector(depth_map, ordered_pts=ordered_pts)
 
-    if ordered_pts:
-        H, W = depth_map.shape
-        world_pos = world_pos.reshape(world_pos.shape[0], H, W)
 
-    return world_pos
+def grid_outlier_mask(points_map, nb_neighbors=20, std_ratio=10.0):
+    """
+    Statistical outlier removal on an ordered point map. Neighbors are taken
+    from the image grid instead of a k-d tree: the window is the smallest
+    square around each pixel holding at least nb_neighbors other pixels.
+    As with Open3D, a point is kept if its mean distance to its nb_neighbors
+    closest valid neighbors is within std_ratio standard deviations of the
+    mean over the map.
+
+    :param points_map: ordered points, (..., 3, H, W)
+    :param nb_neighbors: minimum number of grid neighbors per point
+    :param std_ratio: threshold on the mean neighbor distance, in std devs
+    :return: mask of points to keep, (..., H, W)
+    """
+    *batch, C, H, W = points_map.shape
+    radius = math.ceil((math.sqrt(nb_neighbors + 1) - 1) / 2)
+    size = 2 * radius + 1
+
+    points = points_map.reshape(-1, C, H, W)
+    valid = torch.isfinite(points).all(dim=1)
+    points = torch.where(valid.unsqueeze(1), points, torch.nan)
+    padded = F.pad(points, (radius,) * 4, value=float("nan"))
+    patches = F.unfold(padded, size).view(len(points), C, size * size, H * W)
+
+    # vector_norm over the channel axis is much slower than summing squares
+    dist = (patches - points.view(len(points), C, 1, H * W)).square().sum(1).sqrt()
+    dist[:, size * size // 2] = torch.inf  # the point itself
+    dist = dist.nan_to_num_(nan=torch.inf, posinf=torch.inf)
+    dist = dist.transpose(1, 2).contiguous()
+
+    # like a k-d tree search, only the nb_neighbors closest points count: drop
+    # the largest entries of each window, which come after the invalid ones
+    finite = torch.isfinite(dist)
+    dropped = dist.topk(size * size - nb_neighbors, dim=-1).values
+    dropped_finite = torch.isfinite(dropped)
+    total = torch.where(finite, dist, 0).sum(-1)
+    total -= torch.where(dropped_finite, dropped, 0).sum(-1)
+    count = finite.sum(-1) - dropped_finite.sum(-1)
+    mean_dist = (total / count).view(-1, H, W)
+
+    # statistics per cloud over the points that have valid neighbors
+    mean_dist = torch.where(valid, mean_dist, torch.nan)
+    mu = mean_dist.nanmean(dim=(-2, -1), keepdim=True)
+    n = (~torch.isnan(mean_dist)).sum(dim=(-2, -1), keepdim=True)
+    var = ((mean_dist - mu) ** 2).nansum(dim=(-2, -1), keepdim=True) / (n - 1)
+    mask = mean_dist <= mu + std_ratio * var.sqrt()
+    return mask.view(*batch, H, W)
+
+
+def remove_outlier_pts_grid(points_map, nb_neighbors=20, std_ratio=10.0):
+    """
+    :param points_map: ordered points, (3, H, W)
+    :return: points kept by grid_outlier_mask, (3, N)
+    """
+    mask = grid_outlier_mask(points_map, nb_neighbors, std_ratio)
+    return points_map[:, mask]
 
 
 """
@@ -221,6 +345,8 @@ Open3D helper functions
 
 
 def remove_outlier_pts(points3d, nb_neighbors=20, std_ratio=10.0):
+    import open3d as o3d
+
     points3d_np = (
         points3d.cpu().detach().numpy() if torch.is_tensor(points3d) else points3d
     )
@@ -232,8 +358,7 @@ def remove_outlier_pts(points3d, nb_neighbors=20, std_ratio=10.0):
     )
 
     points3d_filt = np.asarray(cloud_filt.points).transpose()
-    points3d_filt = (
-        torch.tensor(points3d_filt) if torch.is_tensor(points3d) else points3d_filt
-    )
+    if torch.is_tensor(points3d):
+        points3d_filt = torch.from_numpy(points3d_filt).to(points3d.device)
 
     return points3d_filt
@@ -1,7 +1,8 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
 
-import copy
 import logging
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 
 import numpy.typing as npt
@@ -9,7 +10,9 @@ import torch
 import torch.nn as nn
 
 import pytouch.tasks.surface3d.geometry as geometry
-from pytouch.models import Pix2PixModel, PyTouchZoo
+from pytouch.models import ModelKey, Pix2PixModel, PyTouchZoo, model_registry
+from pytouch.models.pix2pix.thirdparty.poisson import PoissonSolver
+from pytouch.tasks.surface3d.poisson import TorchPoissonSolver
 
 _log = logging.getLogger(__name__)
 
@@ -31,6 +34,12 @@ class Surface3D(nn.Module):
         normal: npt.NDArray
         depth: npt.NDArray
 
+    POISSON_BACKENDS = ("torch", "scipy")
+    OUTLIER_METHODS = ("grid", "open3d")
+    STAGES = ("network", "gradient", "poisson", "unprojection", "outlier_removal")
+    # projectors kept for the most recently used sizes and camera matrices
+    MAX_PROJECTORS = 4
+
     def __init__(
         self,
         sensor,
@@ -38,28 +47,83 @@ class Surface3D(nn.Module):
         model_params=Surface3DModelDefaults,
         zoo_model="p2p_surface_3d",
         model_path="",
+        poisson_backend="torch",
+        poisson_workers=None,
+        outlier_removal="grid",
+        registry=model_registry,
     ):
         super(Surface3D, self).__init__()
         self.sensor = sensor
         self.sensor_params = sensor_params
         self.model_path = model_path
-        self.model = Pix2PixModel(
+        if poisson_backend not in self.POISSON_BACKENDS:
+            raise NotImplementedError(f"Unknown Poisson backend {poisson_backend}.")
+        if outlier_removal not in self.OUTLIER_METHODS:
+            raise NotImplementedError(f"Unknown outlier removal {outlier_removal}.")
+        self.outlier_removal = outlier_removal
+        self.poisson_solver = (
+            TorchPoissonSolver()
+            if poisson_backend == "torch"
+            else PoissonSolver(workers=poisson_workers)
+        )
+        if model_path:
+            self.model = self._load_model(model_params, model_path)
+        elif registry is None:
+            self.model = self._load_model(model_params, model_path, zoo_model)
+        else:
+            # the Pix2Pix parameters shape the network, so they are part of the key
+            params = (
+                model_params.name,
+                model_params.model_type,
+                model_params.dataset_mode,
+                model_params.direction,
+            )
+            self.model = registry.get(
+                ModelKey(zoo_model, sensor.zoo_name(), "pth-" + "-".join(params)),
+                lambda: self._load_model(model_params, model_path, zoo_model),
+            )
+        self._projectors = OrderedDict()
+        self.reset_timings()
+
+    def __call__(self):
+        return self.point_cloud_3d()
+
+    def _load_model(self, model_params, model_path, zoo_model=None):
+        model = Pix2PixModel(
             model_params.name,
             model_params.model_type,
             model_dir=model_path,
             dataset_mode=model_params.dataset_mode,
             direction=model_params.direction,
         )
-        if not model_path:
+        if zoo_model is not None:
             zoo = PyTouchZoo()
-            state_dict = zoo.load_model_from_zoo(zoo_model, sensor)
-            self.model.init_zoo_model(state_dict)
+            state_dict = zoo.load_model_from_zoo(zoo_model, self.sensor)
+            model.init_zoo_model(state_dict)
+        return model
 
-    def __call__(self):
-        return self.point_cloud_3d()
+    def reset_timings(self):
+        self.timings = dict.fromkeys(self.STAGES, 0.0)
+        self.timed_frames = 0
+
+    def stage_timings(self):
+        """
+        Returns the mean time in seconds spent per frame in each reconstruction
+        stage since the last reset_timings call.
+        """
+        frames = max(self.timed_frames, 1)
+        return {stage: total / frames for stage, total in self.timings.items()}
+
+    def _lap(self, stage, start, device):
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+        now = time.perf_counter()
+        self.timings[stage] += now - start
+        return now
 
     def normals(self, img_input):
-        img_normal_pred = self.model.color_to_normal(img_input).to("cpu")
+        # prediction stays on the model device
+        img_normal_pred = self.model.color_to_normal(img_input)
         # todo(lambetam) determine if sensor or sim
         return img_normal_pred
 
@@ -83,9 +147,14 @@ class Surface3D(nn.Module):
         depth=0.02,
         max_depth=None,
     ):
-        boundary = torch.zeros((img_normal.shape[-2], img_normal.shape[-1]))
+        # zero boundary
         img_depth = geometry.integrate_grad_depth(
-            grad_x, grad_y, boundary=boundary, bg_mask=bg_mask, max_depth=depth
+            grad_x,
+            grad_y,
+            boundary=None,
+            bg_mask=bg_mask,
+            max_depth=depth,
+            solver=self.poisson_solver,
         )
         if remove_bg_depth:
             img_depth = geometry.mask_background(
@@ -94,40 +163,81 @@ class Surface3D(nn.Module):
         return img_depth
 
     def depth_to_points3d(self, img_depth, view_mat, proj_mat):
-        view_mat = (
-            view_mat if isinstance(view_mat, torch.Tensor) else torch.tensor(view_mat)
-        )
-        proj_mat = (
-            view_mat if isinstance(proj_mat, torch.Tensor) else torch.tensor(proj_mat)
+        points_3d = self.unproject(img_depth, view_mat, proj_mat, ordered_pts=True)
+        points_3d = self.remove_outliers(points_3d)
+        return points_3d
+
+    def unproject(self, img_depth, view_mat, proj_mat, ordered_pts=False):
+        """
+        Unprojects one or a batch of depth maps, (..., H, W), to 3 x N points,
+        or to 3 x H x W point maps with ordered_pts.
+        Projectors are cached by size, device and matrix values, so matrices
+        changed in place get a new projector.
+        """
+        H, W = img_depth.shape[-2:]
+        view_mat = torch.as_tensor(view_mat, dtype=torch.float64).cpu()
+        proj_mat = torch.as_tensor(proj_mat, dtype=torch.float64).cpu()
+        key = (
+            H,
+            W,
+            img_depth.device,
+            img_depth.dtype,
+            view_mat.numpy().tobytes(),
+            proj_mat.numpy().tobytes(),
         )
+        if key in self._projectors:
+            self._projectors.move_to_end(key)
+        else:
+            # the camera offset is a pose, the projector expects the view transform
+            self._projectors[key] = geometry.Projector(
+                H,
+                W,
+                proj_mat,
+                torch.inverse(view_mat),
+                self.sensor_params,
+                device=img_depth.device,
+                dtype=img_depth.dtype,
+            )
+            while len(self._projectors) > self.MAX_PROJECTORS:
+                self._projectors.popitem(last=False)
+        return self._projectors[key](img_depth, ordered_pts=ordered_pts)
 
-        view_mat = torch.inverse(view_mat)
+    def remove_outliers(self, points_map):
+        """
+        :param points_map: ordered points, (3, H, W) or (N, 3, H, W)
+        :return: filtered 3 x M points, or a list of them for a batch
+        """
+        if self.outlier_removal == "grid":
+            masks = geometry.grid_outlier_mask(
+                points_map, nb_neighbors=20, std_ratio=10.0
+            )
+            if points_map.dim() == 3:
+                return points_map[:, masks]
+            return [points[:, mask] for points, mask in zip(points_map, masks)]
 
-        points_3d = geometry.depth_to_pts3d(
-            depth=img_depth, P=proj_mat, V=view_mat, params=self.sensor_params
-        )
-        points_3d = geometry.remove_outlier_pts(
-            points_3d, nb_neighbors=20, std_ratio=10.0
-        )
-        return points_3d
+        if points_map.dim() == 3:
+            return geometry.remove_outlier_pts(
+                points_map.flatten(1), nb_neighbors=20, std_ratio=10.0
+            )
+        return [self.remove_outliers(points) for points in points_map]
 
     def point_cloud_3d(self, img_color, img_normal_gt=None, img_depth_gt=None):
-        normal_pred = self.normals(img_color)
-
-        color = copy.deepcopy(img_color)
-        normal = copy.deepcopy(normal_pred)
+        start = time.perf_counter()
+        normal = self.normals(img_color)
+        device = normal.device
+        start = self._lap("network", start, device)
 
         # TODO (psodhi): Background gt normals nx, ny are non-zero for sim but correctly zero for real.
         # Hence, we mask out background in sim relying on gt depth. Once background is fixed,
         # we can remove the code snippet below.
         bg_mask = None
         if self.sensor == "sim":
-            depth_gt = copy.deepcopy(img_depth_gt)
-            bg_mask = (depth_gt > self.gel_depth).squeeze()
+            bg_mask = (img_depth_gt > self.gel_depth).squeeze().to(device)
 
         img_grad_depth, grad_x, grad_y = self.normal_to_grad_depth(
             normal, self.sensor_params.gel_width, self.sensor_params.gel_height, bg_mask
         )
+        start = self._lap("gradient", start, device)
 
         img_depth = self.grad_depth_to_depth(
             img_grad_depth,
@@ -137,16 +247,98 @@ class Surface3D(nn.Module):
             remove_bg_depth=self.sensor_params.remove_background_depth,
             max_depth=self.sensor_params.max_depth,
         )
+        start = self._lap("poisson", start, device)
 
-        img_points3d = self.depth_to_points3d(
-            img_depth, self.sensor_params.T_cam_offset_sim, self.sensor_params.P
+        img_points3d = self.unproject(
+            img_depth,
+            self.sensor_params.T_cam_offset_sim,
+            self.sensor_params.P,
+            ordered_pts=True,
         )
+        start = self._lap("unprojection", start, device)
+        img_points3d = self.remove_outliers(img_points3d)
+        self._lap("outlier_removal", start, device)
+        self.timed_frames += 1
 
-        # numpy
-        img_color_np = (color.permute(1, 2, 0)).cpu().detach().numpy()
-        img_normal_np = (normal.permute(1, 2, 0)).cpu().detach().numpy()
-        img_depth_np = img_depth.cpu().detach().numpy()
-
+        # single conversion to numpy at the return boundary
         return self.Surface3DReturn(
-            img_points3d, img_color_np, img_normal_np, img_depth_np
+            _to_numpy(img_points3d),
+            _to_numpy(img_color.permute(1, 2, 0)),
+            _to_numpy(normal.permute(1, 2, 0)),
+            _to_numpy(img_depth),
         )
+
+    def batch_point_clouds(self, images, img_depth_gt=None, chunk_size=16):
+        """
+        Reconstructs point clouds for a sequence of color images. Each chunk of
+        frames goes through every stage together.
+
+        :param images: N x C x H x W tensor or sequence of C x H x W tensors
+        :param img_depth_gt: optional N x 1 x H x W ground truth depth, needed for sim
+        :param chunk_size: number of frames reconstructed together
+        :return: list of Surface3DReturn, one per frame
+        """
+        results = []
+        for i in range(0, len(images), chunk_size):
+            depth_gt = (
+                None if img_depth_gt is None else img_depth_gt[i : i + chunk_size]
+            )
+            results.extend(self._point_clouds(images[i : i + chunk_size], depth_gt))
+        return results
+
+    def _point_clouds(self, images, img_depth_gt=None):
+        start = time.perf_counter()
+        normals = self.model.color_to_normal_batch(images)
+        device = normals.device
+        start = self._lap("network", start, device)
+
+        bg_mask = None
+        if self.sensor == "sim":
+            bg_mask = (img_depth_gt > self.gel_depth).squeeze(-3).to(device)
+
+        img_grad_depth, grad_x, grad_y = self.normal_to_grad_depth(
+            normals,
+            self.sensor_params.gel_width,
+            self.sensor_params.gel_height,
+            bg_mask,
+        )
+        start = self._lap("gradient", start, device)
+
+        img_depths = self.grad_depth_to_depth(
+            img_grad_depth,
+            grad_x,
+            grad_y,
+            bg_mask,
+            remove_bg_depth=self.sensor_params.remove_background_depth,
+            max_depth=self.sensor_params.max_depth,
+        )
+        start = self._lap("poisson", start, device)
+
+        points3d = self.unproject(
+            img_depths,
+            self.sensor_params.T_cam_offset_sim,
+            self.sensor_params.P,
+            ordered_pts=True,
+        )
+        start = self._lap("unprojection", start, device)
+        points3d = self.remove_outliers(points3d)
+        self._lap("outlier_removal", start, device)
+
+        results = []
+        for img_color, normal, img_depth, img_points3d in zip(
+            images, normals, img_depths, points3d
+        ):
+            results.append(
+                self.Surface3DReturn(
+                    _to_numpy(img_points3d),
+                    _to_numpy(img_color.permute(1, 2, 0)),
+                    _to_numpy(normal.permute(1, 2, 0)),
+                    _to_numpy(img_depth),
+                )
+            )
+        self.timed_frames += len(results)
+        return results
+
+
+def _to_numpy(x):
+    return x.detach().cpu().numpy() if torch.is_tensor(x) else x
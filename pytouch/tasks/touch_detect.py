@@ -1,13 +1,21 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
 
 import logging
+import os
 
+import numpy as np
 import torch
 import torch.nn as nn
+from PIL import Image
 from torchvision import transforms
 
-from pytouch.models import PyTouchZoo
-from pytouch.models.touch_detect import TouchDetectModel, TouchDetectModelDefaults
+from pytouch.models import ModelKey, OnnxSessionModel, PyTouchZoo, model_registry
+from pytouch.models.touch_detect import (
+    QuantizedTouchDetectModel,
+    TouchDetectModel,
+    TouchDetectModelDefaults,
+)
+from pytouch.utils.transforms import FastFrameTransform
 
 _log = logging.getLogger(__name__)
 
@@ -20,23 +28,94 @@ class TouchDetect(nn.Module):
         model_path=None,
         transform=None,
         defaults=TouchDetectModelDefaults,
-        **kwargs
+        max_batch_size=64,
+        fast_preprocess=True,
+        bgr=False,
+        backend="torch",
+        num_threads=None,
+        quantize=None,
+        calibration_data=None,
+        registry=model_registry,
+        mmap=False,
+        **kwargs,
     ):
         self.sensor = sensor
         if "pretrained" not in kwargs:
             kwargs["pretrained"] = False
         self.model_path = model_path
         self.defaults = defaults
+        self.max_batch_size = max_batch_size
+        self.bgr = bgr
+        self.backend = backend
+        self.mmap = mmap
         self.transform = transform if transform is not None else self._transforms()
+        # raw ndarray frames skip PIL and torchvision when the default transform is
+        # used, the torchvision chain stays available with fast_preprocess=False
+        self.fast_transform = None
+        if fast_preprocess and transform is None:
+            self.fast_transform = FastFrameTransform(
+                defaults.SCALES,
+                defaults.MEANS,
+                defaults.STDS,
+                bgr=bgr,
+                max_batch_size=max_batch_size,
+            )
 
+        if backend == "onnxruntime":
+            if model_path is not None:
+                session = PyTouchZoo.load_onnx_session(model_path, num_threads)
+                self.model = OnnxSessionModel(session)
+            else:
+                # sessions are shared, so the thread count is part of the key
+                threads = "" if num_threads is None else f"-{num_threads}threads"
+                key = ModelKey(zoo_model, sensor.zoo_name(), "onnx", backend + threads)
+                self.model = self._load_shared(
+                    registry, key, lambda: self._load_onnx(zoo_model, num_threads)
+                )
+        elif backend == "torch":
+            if model_path is not None:
+                # load custom model from path
+                self.model = self._load_torch(model_path, None, quantize)
+            elif quantize == "static":
+                # calibration changes the weights, so these are never shared
+                self.model = self._load_torch(None, zoo_model, quantize)
+            else:
+                # load model from pytouch zoo, mmap weights are shared read only so
+                # they are kept apart from the copied ones
+                if quantize is not None:
+                    dtype = f"qint8-{quantize}"
+                else:
+                    dtype = "float32-mmap" if mmap else "float32"
+                key = ModelKey(zoo_model, sensor.zoo_name(), dtype=dtype)
+                self.model = self._load_shared(
+                    registry, key, lambda: self._load_torch(None, zoo_model, quantize)
+                )
+            if quantize is not None and calibration_data is not None:
+                self.calibrate(calibration_data)
+        else:
+            raise NotImplementedError(f"Unknown inference backend {backend}.")
+
+    @staticmethod
+    def _load_shared(registry, key, factory):
+        return factory() if registry is None else registry.get(key, factory)
+
+    def _load_onnx(self, zoo_model, num_threads):
+        model_file = PyTouchZoo().model_file(zoo_model, self.sensor, "onnx")
+        session = PyTouchZoo.load_onnx_session(model_file, num_threads)
+        return OnnxSessionModel(session, nbytes=os.path.getsize(model_file))
+
+    def _load_torch(self, model_path, zoo_model, quantize):
+        # quantization replaces the weights, so only float models use the mmap
+        mmap = self.mmap and quantize is None
         if model_path is not None:
-            # load custom model from path
-            state_dict = PyTouchZoo.load_model(model_path)
+            state_dict = PyTouchZoo.load_model(model_path, mmap=mmap)
         else:
-            # load model from pytouch zoo
-            zoo = PyTouchZoo()
-            state_dict = zoo.load_model_from_zoo(zoo_model, sensor)
-        self.model = TouchDetectModel(state_dict=state_dict)
+            state_dict = PyTouchZoo().load_model_from_zoo(
+                zoo_model, self.sensor, mmap=mmap
+            )
+        if quantize is None:
+            return TouchDetectModel(state_dict=state_dict, share_weights=mmap)
+        return QuantizedTouchDetectModel(state_dict=state_dict, mode=quantize)
 
     def __call__(self, frame):
         return self.is_touching(frame)
@@ -45,15 +124,91 @@ class TouchDetect(nn.Module):
         if isinstance(frame, torch.Tensor):
             output = self._predict(frame)
         else:
-            output = self.process(frame)
+            output = self._process(frame, reuse_buffer=True)
             output = self._predict(output)
         return output
 
+    def calibrate(self, data, num_batches=None):
+        """
+        Calibrates a static int8 quantized model, see QuantizedTouchDetectModel.
+        :param data: Iterable of preprocessed input batches, e.g. a DataLoader over a
+        DigitFolder using this task transform
+        :param num_batches: Number of batches to use, defaults to all
+        :return: None
+        """
+        if not isinstance(self.model, QuantizedTouchDetectModel):
+            raise AssertionError("Only quantized models can be calibrated.")
+        self.model.calibrate(data, num_batches=num_batches)
+
+    def predict_batch(self, frames, max_batch_size=None):
+        """
+        Runs touch detection over many frames, one forward pass per chunk.
+        :param frames: List of PIL images or ndarrays, or a preprocessed N x C x H x W
+        tensor
+        :param max_batch_size: Maximum frames per forward pass, defaults to the task
+        max_batch_size
+        :return: Tuple of N predictions and N certainties arrays
+        """
+        max_batch_size = (
+            self.max_batch_size if max_batch_size is None else max_batch_size
+        )
+        if len(frames) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if isinstance(frames, torch.Tensor):
+            frames_t = frames if frames.dim() == 4 else frames.unsqueeze(0)
+            chunks = frames_t.split(max_batch_size)
+        else:
+            chunks = (
+                self._process_batch(frames[i : i + max_batch_size], reuse_buffer=True)
+                for i in range(0, len(frames), max_batch_size)
+            )
+        with torch.no_grad():
+            output = torch.cat([self.model(chunk) for chunk in chunks])
+        certainty, prediction = nn.functional.softmax(output, dim=1).max(dim=1)
+        return prediction.cpu().numpy(), certainty.cpu().numpy()
+
     def process(self, frame):
+        """
+        :param frame: PIL image or H x W x C ndarray
+        :return: Preprocessed 1 x C x H x W tensor
+        """
+        return self._process(frame, reuse_buffer=False)
+
+    def process_batch(self, frames):
+        """
+        :param frames: List of PIL images or H x W x C ndarrays
+        :return: Preprocessed N x C x H x W tensor
+        """
+        return self._process_batch(frames, reuse_buffer=False)
+
+    def _process(self, frame, reuse_buffer):
+        # the reusable buffer is only handed to code that runs the model right away
+        if self.fast_transform is not None and isinstance(frame, np.ndarray):
+            out = self.fast_transform.buffer(1) if reuse_buffer else None
+            return self.fast_transform(frame, out=out)
+        if isinstance(frame, np.ndarray):
+            frame = self._to_image(frame)
         frame_t = self.transform(frame)
         frame_t = frame_t.unsqueeze_(0)
         return frame_t
 
+    def _process_batch(self, frames, reuse_buffer):
+        if self.fast_transform is not None and all(
+            isinstance(frame, np.ndarray) for frame in frames
+        ):
+            out = self.fast_transform.buffer(len(frames)) if reuse_buffer else None
+            return self.fast_transform.batch(frames, out=out)
+        frames = [
+            self._to_image(frame) if isinstance(frame, np.ndarray) else frame
+            for frame in frames
+        ]
+        return torch.stack([self.transform(frame) for frame in frames])
+
+    def _to_image(self, frame):
+        if self.bgr:
+            frame = frame[..., ::-1]
+        return Image.fromarray(np.ascontiguousarray(frame))
+
     def _predict(self, frame_t):
         with torch.no_grad():
             output = self.model(frame_t)
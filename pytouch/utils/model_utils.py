@@ -1,5 +1,7 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
 
+import inspect
+import itertools
 import logging
 import random
 from collections import OrderedDict
@@ -42,6 +44,31 @@ def convert_state_dict_if_from_pl(checkpoint):
         return pl_state_dict
 
 
+def module_nbytes(module):
+    """
+    Bytes held by the parameters and buffers of a torch module, shared tensors
+    are counted once. Returns 0 for anything that is not a module.
+    """
+    if not isinstance(module, torch.nn.Module):
+        return 0
+    tensors = {}
+    for tensor in itertools.chain(module.parameters(), module.buffers()):
+        tensors[tensor.data_ptr()] = tensor.numel() * tensor.element_size()
+    return sum(tensors.values())
+
+
+def check_weight_sharing_support():
+    """
+    Memory-mapped checkpoints and models built around shared weights rely on
+    torch.load(mmap=True), load_state_dict(assign=True) and the meta device
+    context manager, all available from torch 2.1.
+    """
+    if "mmap" not in inspect.signature(torch.load).parameters:
+        raise NotImplementedError(
+            f"Memory-mapped weights require torch>=2.1, found torch {torch.__version__}."
+        )
+
+
 def _choose_last_fc_mode(mode):
     assert mode in ["score", "feature"]
     if mode == "score":
@@ -1,5 +1,18 @@
 from pytouch_sensors import digit
 from pytouch_sensors import gelsight
+from pytouch_sensors.array import DeviceStats, FrameSet, SensorArray
+from pytouch_sensors.grabber import FrameGrabber, GrabberStats, TimestampedFrame
+from pytouch_sensors.orientation import Orientation
 
 __version__ = "0.1.0"
-__all__ = ["digit", "gelsight"]
+__all__ = [
+    "digit",
+    "gelsight",
+    "DeviceStats",
+    "FrameGrabber",
+    "FrameSet",
+    "GrabberStats",
+    "Orientation",
+    "SensorArray",
+    "TimestampedFrame",
+]
@@ -0,0 +1,291 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+# This source code is licensed under the license found in the LICENSE file in the root directory of this source tree.
+
+import collections
+import inspect
+import logging
+import threading
+import time
+import typing
+from dataclasses import dataclass
+
+from pytouch_sensors.grabber import FrameGrabber, TimestampedFrame
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FrameSet:
+    # one frame per device, keyed by device name
+    frames: typing.Dict[str, TimestampedFrame]
+    # timestamp of the reference frame the others were matched to
+    timestamp: float
+    # largest timestamp difference between two frames of the set
+    skew: float
+
+    def __getitem__(self, name: str) -> TimestampedFrame:
+        return self.frames[name]
+
+
+@dataclass(frozen=True)
+class DeviceStats:
+    fps: float
+    grabbed: int
+    dropped: int
+    overruns: int
+    read_errors: int
+    # frames delivered in a frameset
+    matched: int
+    # frames discarded because no other device had a frame close enough in time
+    unmatched: int
+    # seconds from capture until delivery in a frameset
+    latency_mean: float
+    latency_max: float
+    # seconds between the frame and the frameset reference timestamp
+    offset_mean: float
+
+
+class _DeviceState:
+    def __init__(self, device: typing.Any, grabber: FrameGrabber, buffer_size: int):
+        self.device = device
+        self.grabber = grabber
+        self.pending: typing.Deque[TimestampedFrame] = collections.deque()
+        self.buffer_size = buffer_size
+        self.matched = 0
+        self.unmatched = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.offset_sum = 0.0
+
+    def collect(self) -> None:
+        self.pending.extend(self.grabber.drain())
+        while len(self.pending) > self.buffer_size:
+            self.pending.popleft()
+            self.unmatched += 1
+
+    def discard(self, timestamp: float) -> None:
+        while self.pending and self.pending[0].timestamp <= timestamp:
+            self.pending.popleft()
+            self.unmatched += 1
+
+
+class SensorArray:
+    """
+    Captures from several sensors at once and delivers time aligned framesets.
+
+    Each device is read on its own FrameGrabber thread and frames are stamped
+    with time.monotonic() as they are read. A frameset is built around the
+    newest frame of the device that is furthest behind, with the nearest frame
+    of every other device; it is only delivered when all of them lie within
+    tolerance of that reference. Frames that can no longer be matched are
+    discarded and counted per device.
+    """
+
+    def __init__(
+        self,
+        devices: typing.Union[
+            typing.Mapping[str, typing.Any], typing.Sequence[typing.Any]
+        ],
+        tolerance: typing.Optional[float] = None,
+        buffer_size: int = 8,
+    ) -> None:
+        """
+        :param devices: Sensors providing get_frame(), e.g. Digit or GelsightMini, either
+        keyed by name or named after their name or serial
+        :param tolerance: Maximum time in seconds between a frame and the frameset
+        reference, defaults to half the frame period of the fastest device
+        :param buffer_size: Number of frames kept per device while waiting for a match
+        """
+        if not isinstance(devices, typing.Mapping):
+            devices = {
+                self._device_name(device, i): device for i, device in enumerate(devices)
+            }
+        if not devices:
+            raise ValueError("SensorArray needs at least one device")
+
+        fps = [getattr(device, "fps", None) for device in devices.values()]
+        fps = [f for f in fps if f]
+        if tolerance is None:
+            tolerance = 0.5 / max(fps) if fps else 0.01
+        self.tolerance = tolerance
+
+        self._new_frame = threading.Condition()
+        self._updated = False
+        self._devices: typing.Dict[str, _DeviceState] = {}
+        for name, device in devices.items():
+            grabber = FrameGrabber(
+                device.get_frame,
+                buffer_size=buffer_size,
+                fps=getattr(device, "fps", None),
+                name=f"{name}:capture",
+                on_frame=self._notify,
+                grab_into="out" in inspect.signature(device.get_frame).parameters,
+            )
+            self._devices[name] = _DeviceState(device, grabber, buffer_size)
+
+    @staticmethod
+    def _device_name(device: typing.Any, index: int) -> str:
+        return (
+            getattr(device, "name", None)
+            or getattr(device, "serial", None)
+            or f"sensor{index}"
+        )
+
+    @classmethod
+    def digits(
+        cls,
+        serials: typing.Optional[typing.Sequence[str]] = None,
+        stream: typing.Any = None,
+        **kwargs,
+    ) -> "SensorArray":
+        """
+        Connects to DIGITs and captures from all of them
+        :param serials: DIGIT serials, all connected DIGITs if None
+        :param stream: Stream to connect with, see DigitStreams
+        :return: SensorArray keyed by serial
+        """
+        from pytouch_sensors.digit import Digit, DigitStreams, find
+
+        if serials is None:
+            serials = [device["serial"] for device in find()]
+        devices = {}
+        for serial in serials:
+            devices[serial] = Digit(serial)
+            devices[serial].connect(stream or DigitStreams.QVGA_60fps)
+        return cls(devices, **kwargs)
+
+    @property
+    def names(self) -> typing.List[str]:
+        return list(self._devices)
+
+    @property
+    def devices(self) -> typing.Dict[str, typing.Any]:
+        return {name: state.device for name, state in self._devices.items()}
+
+    @property
+    def is_running(self) -> bool:
+        return all(state.grabber.is_running for state in self._devices.values())
+
+    def _notify(self) -> None:
+        with self._new_frame:
+            self._updated = True
+            self._new_frame.notify_all()
+
+    def start(self) -> "SensorArray":
+        for state in self._devices.values():
+            state.grabber.start()
+        return self
+
+    def stop(self) -> None:
+        for state in self._devices.values():
+            state.grabber.stop()
+
+    def disconnect(self) -> None:
+        """
+        Stops capture and disconnects all devices
+        :return: None
+        """
+        self.stop()
+        for state in self._devices.values():
+            state.device.disconnect()
+
+    def __enter__(self) -> "SensorArray":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def __iter__(self) -> typing.Iterator[FrameSet]:
+        while True:
+            frameset = self.read()
+            if frameset is None:
+                return
+            yield frameset
+
+    def _check_errors(self) -> None:
+        for name, state in self._devices.items():
+            if state.grabber.error is not None:
+                raise IOError(f"Capture from {name} failed") from state.grabber.error
+
+    def _match(self) -> typing.Optional[FrameSet]:
+        states = self._devices.values()
+        while all(state.pending for state in states):
+            reference = min(state.pending[-1].timestamp for state in states)
+            frames = {
+                name: min(state.pending, key=lambda f: abs(f.timestamp - reference))
+                for name, state in self._devices.items()
+            }
+            if any(
+                abs(f.timestamp - reference) > self.tolerance for f in frames.values()
+            ):
+                # the reference frame has no partner on some device and never will
+                for state in states:
+                    state.discard(reference)
+                continue
+
+            now = time.monotonic()
+            for name, state in self._devices.items():
+                frame = frames[name]
+                while state.pending[0] is not frame:
+                    state.pending.popleft()
+                    state.unmatched += 1
+                state.pending.popleft()
+                state.matched += 1
+                latency = now - frame.timestamp
+                state.latency_sum += latency
+                state.latency_max = max(state.latency_max, latency)
+                state.offset_sum += abs(frame.timestamp - reference)
+            timestamps = [f.timestamp for f in frames.values()]
+            return FrameSet(frames, reference, max(timestamps) - min(timestamps))
+        return None
+
+    def read(self, timeout: typing.Optional[float] = None) -> typing.Optional[FrameSet]:
+        """
+        Returns the next time aligned frameset, waiting for frames if needed
+        :param timeout: Maximum time to wait in seconds, None to wait indefinitely
+        :return: FrameSet, None on timeout or when capture is stopped
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._new_frame:
+                self._updated = False
+            for state in self._devices.values():
+                state.collect()
+            frameset = self._match()
+            if frameset is not None:
+                return frameset
+            self._check_errors()
+            if not self.is_running:
+                return None
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            with self._new_frame:
+                self._new_frame.wait_for(lambda: self._updated, remaining)
+
+    def stats(self) -> typing.Dict[str, DeviceStats]:
+        """
+        Returns capture and synchronization statistics per device
+        :return: DeviceStats keyed by device name
+        """
+        stats = {}
+        for name, state in self._devices.items():
+            grabber_stats = state.grabber.stats()
+            matched = max(state.matched, 1)
+            stats[name] = DeviceStats(
+                fps=grabber_stats.fps,
+                grabbed=grabber_stats.grabbed,
+                dropped=grabber_stats.dropped,
+                overruns=grabber_stats.overruns,
+                read_errors=grabber_stats.read_errors,
+                matched=state.matched,
+                unmatched=state.unmatched,
+                latency_mean=state.latency_sum / matched,
+                latency_max=state.latency_max,
+                offset_mean=state.offset_sum / matched,
+            )
+        return stats
+
+
+__all__ = ["DeviceStats", "FrameSet", "SensorArray"]
@@ -15,6 +15,9 @@ from dataclasses import dataclass
 
 import numpy as np
 
+from pytouch_sensors.grabber import FrameGrabber, GrabberStats, TimestampedFrame
+from pytouch_sensors.orientation import ROTATE_COUNTERCLOCKWISE, Orientation
+
 try:
     import pyudev
 except ImportError as err:
@@ -79,6 +82,9 @@ class Digit:
         self.serial: str = serial
         self.name: typing.Optional[str] = name
         self.__dev: cv2.VideoCapture = None
+        self.__grabber: typing.Optional[FrameGrabber] = None
+        # reused for raw frames that are rotated into a separate output
+        self.__raw: typing.Optional[np.ndarray] = None
 
         self.dev_name: str
         self.manufacturer: str
@@ -182,13 +188,49 @@ class Digit:
         )
         return self.intensity
 
-    def get_frame(self, transpose: bool = False) -> np.ndarray:
+    def get_frame(
+        self, transpose: bool = False, out: typing.Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Returns a single image frame for the device, the next captured frame if
+        background capture is running
+        :param transpose: Show direct output from the image sensor, WxH instead of HxW,
+        the start_capture setting applies while capturing
+        :param out: Reusable buffer the frame is written into, allocated if None
+        :return: Image frame array, out if given
+        """
+        if self.__grabber is not None:
+            frame = self.get_latest_frame(wait=True)
+            if frame is None:
+                raise Exception(
+                    f"Background capture of {self.serial} stopped without a frame"
+                )
+            frame = frame.frame
+            if out is not None:
+                np.copyto(out, frame)
+                return out
+            return frame
+        return self._read_frame(transpose, out)
+
+    def get_raw_frame(
+        self, out: typing.Optional[np.ndarray] = None
+    ) -> typing.Tuple[np.ndarray, Orientation]:
         """
-        Returns a single image frame for the device
-        :param transpose: Show direct output from the image sensor, WxH instead of HxW
-        :return: Image frame array
+        Returns the direct output from the image sensor together with its orientation,
+        so rotating the frame upright can be deferred, fused or skipped
+        :param out: Reusable buffer the frame is read into, allocated if None
+        :return: Raw WxH frame and the Orientation that makes it upright
         """
-        ret, frame = self.__dev.read()
+        return self._read_frame(True, out), ROTATE_COUNTERCLOCKWISE
+
+    def _read_frame(
+        self, transpose: bool, out: typing.Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        if transpose:
+            ret, frame = self.__dev.read(out)
+        else:
+            ret, frame = self.__dev.read(self.__raw)
+            self.__raw = frame
         if not ret:
             logger.error(
                 f"Cannot retrieve frame data from {self.serial}, is device open?"
@@ -197,10 +239,73 @@ class Digit:
                 f"Unable to grab frame from {self.serial} - {self.dev_name}!"
             )
         if not transpose:
-            frame = cv2.transpose(frame, frame)
-            frame = cv2.flip(frame, 0)
+            # transpose and vertical flip fused into a single pass
+            frame = ROTATE_COUNTERCLOCKWISE.apply(frame, out)
         return frame
 
+    def start_capture(
+        self, buffer_size: int = 8, transpose: bool = False
+    ) -> FrameGrabber:
+        """
+        Starts reading frames on a background thread into a ring buffer, so that
+        processing frames does not stall capture
+        :param buffer_size: Number of frames kept, older unread frames are overwritten
+        :param transpose: Capture direct output from the image sensor, WxH instead of HxW
+        :return: The running FrameGrabber
+        """
+        self.stop_capture()
+        self.__grabber = FrameGrabber(
+            lambda out=None: self._read_frame(transpose, out),
+            buffer_size=buffer_size,
+            fps=self.fps,
+            name=f"{self.serial}:capture",
+            grab_into=True,
+        )
+        return self.__grabber.start()
+
+    def stop_capture(self) -> None:
+        if self.__grabber is not None:
+            self.__grabber.stop()
+            self.__grabber = None
+
+    def _capturing_grabber(self) -> FrameGrabber:
+        if self.__grabber is None:
+            raise Exception(f"Background capture of {self.serial} is not started")
+        if self.__grabber.error is not None:
+            raise Exception(
+                f"Unable to grab frame from {self.serial} - {self.dev_name}!"
+            ) from self.__grabber.error
+        return self.__grabber
+
+    def get_latest_frame(
+        self, wait: bool = False, timeout: typing.Optional[float] = None
+    ) -> typing.Optional[TimestampedFrame]:
+        """
+        Returns the newest frame captured in the background
+        :param wait: Block until a frame newer than the last returned one arrives
+        :param timeout: Maximum time to wait in seconds
+        :return: Timestamped frame, None if no frame was captured yet
+        """
+        frame = self._capturing_grabber().latest(wait, timeout)
+        if wait:
+            # capture may have failed while waiting
+            self._capturing_grabber()
+        return frame
+
+    def drain_frames(self) -> typing.List[TimestampedFrame]:
+        """
+        Returns all frames captured in the background since the last drain, oldest first
+        :return: List of timestamped frames
+        """
+        return self._capturing_grabber().drain()
+
+    def capture_stats(self) -> GrabberStats:
+        """
+        Returns background capture counters, see GrabberStats
+        :return: Capture statistics
+        """
+        return self._capturing_grabber().stats()
+
     def save_frame(self, path: str) -> np.ndarray:
         """
         Saves a single image frame to host
@@ -238,6 +343,7 @@ class Digit:
 
     def disconnect(self) -> None:
         logger.debug(f"{self.serial}:Closing device")
+        self.stop_capture()
         self.__dev.release()
 
     def info(self) -> str:
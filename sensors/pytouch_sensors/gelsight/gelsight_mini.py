@@ -6,6 +6,8 @@ import typing
 
 import numpy as np
 
+from pytouch_sensors.orientation import ROTATE_COUNTERCLOCKWISE, Orientation
+
 try:
     import cv2
 except ImportError as err:
@@ -60,6 +62,8 @@ class GelsightMini:
         self.serial: str = serial
         self.name: typing.Optional[str] = name
         self.__dev: cv2.VideoCapture = None
+        # reused for raw frames that are rotated into a separate output
+        self.__raw: typing.Optional[np.ndarray] = None
 
         self.dev_name: str
         self.manufacturer: str
@@ -96,13 +100,20 @@ class GelsightMini:
         self.resolution = (res_width, res_height)
         self.fps = self.__dev.get(cv2.CAP_PROP_FPS)
 
-    def get_frame(self, transpose: bool = False) -> np.ndarray:
+    def get_frame(
+        self, transpose: bool = False, out: typing.Optional[np.ndarray] = None
+    ) -> np.ndarray:
         """
         Returns a single image frame for the device
         :param transpose: Show direct output from the image sensor, WxH instead of HxW
-        :return: Image frame array
+        :param out: Reusable buffer the frame is written into, allocated if None
+        :return: Image frame array, out if given
         """
-        ret, frame = self.__dev.read()
+        if transpose:
+            ret, frame = self.__dev.read(out)
+        else:
+            ret, frame = self.__dev.read(self.__raw)
+            self.__raw = frame
         if not ret:
             logger.error(
                 f"Cannot retrieve frame data from {self.serial}, is device open?"
@@ -111,10 +122,21 @@ class GelsightMini:
                 f"Unable to grab frame from {self.serial} - {self.dev_name}!"
             )
         if not transpose:
-            frame = cv2.transpose(frame, frame)
-            frame = cv2.flip(frame, 0)
+            # transpose and vertical flip fused into a single pass
+            frame = ROTATE_COUNTERCLOCKWISE.apply(frame, out)
         return frame
 
+    def get_raw_frame(
+        self, out: typing.Optional[np.ndarray] = None
+    ) -> typing.Tuple[np.ndarray, Orientation]:
+        """
+        Returns the direct output from the image sensor together with its orientation,
+        so rotating the frame upright can be deferred, fused or skipped
+        :param out: Reusable buffer the frame is read into, allocated if None
+        :return: Raw WxH frame and the Orientation that makes it upright
+        """
+        return self.get_frame(True, out), ROTATE_COUNTERCLOCKWISE
+
     def save_frame(self, path: str) -> np.ndarray:
         """
         Saves a single image frame to host
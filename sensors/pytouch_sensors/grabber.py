@@ -0,0 +1,231 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+# This source code is licensed under the license found in the LICENSE file in the root directory of this source tree.
+
+import logging
+import threading
+import time
+import typing
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TimestampedFrame:
+    frame: np.ndarray
+    # time.monotonic() when the frame was read from the device
+    timestamp: float
+    # number of frames grabbed before this one
+    index: int
+
+
+@dataclass(frozen=True)
+class GrabberStats:
+    grabbed: int
+    # frames the device produced but were never read, estimated from frame gaps
+    dropped: int
+    # unread frames overwritten because the consumer fell behind
+    overruns: int
+    read_errors: int
+    fps: float
+
+
+class FrameGrabber:
+    """
+    Reads frames on a background thread into a fixed size ring buffer so that
+    slow consumers do not stall capture.
+
+    The ring is allocated once, from the shape of the first frame, and every
+    later frame is read into or copied into its slot. When the ring is full the
+    oldest unread frame is overwritten and counted as an overrun.
+    """
+
+    def __init__(
+        self,
+        grab: typing.Callable[[], np.ndarray],
+        buffer_size: int = 8,
+        fps: typing.Optional[float] = None,
+        name: str = "FrameGrabber",
+        max_read_errors: int = 10,
+        on_frame: typing.Optional[typing.Callable[[], None]] = None,
+        grab_into: bool = False,
+    ) -> None:
+        """
+        :param grab: Blocking callable returning the next frame, e.g. Digit.get_frame
+        :param buffer_size: Number of frames kept in the ring, at least 2
+        :param fps: Nominal device frame rate used to estimate dropped frames
+        :param name: Capture thread name
+        :param max_read_errors: Consecutive failed reads before capture stops
+        :param on_frame: Called on the capture thread after each stored frame
+        :param grab_into: grab accepts an out keyword and writes the frame into it, so
+        frames are read straight into the ring without a copy
+        """
+        if buffer_size < 2:
+            raise ValueError("buffer_size must be at least 2")
+        self.grab = grab
+        self.buffer_size = buffer_size
+        self.fps = fps
+        self.name = name
+        self.max_read_errors = max_read_errors
+        self.on_frame = on_frame
+        self.grab_into = grab_into
+        self.error: typing.Optional[Exception] = None
+
+        self._frames: typing.Optional[np.ndarray] = None
+        self._timestamps = np.zeros(buffer_size)
+        # frames [tail, head) are unread, slot of frame i is i % buffer_size
+        self._head = 0
+        self._tail = 0
+        self._latest_read = -1
+        self._dropped = 0
+        self._overruns = 0
+        self._read_errors = 0
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "FrameGrabber":
+        if self.is_running:
+            return self
+        self._stop.clear()
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logger.debug(f"{self.name}:Capture started")
+        return self
+
+    def stop(self, timeout: typing.Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._new_frame:
+            self._new_frame.notify_all()
+        logger.debug(f"{self.name}:Capture stopped")
+
+    def __enter__(self) -> "FrameGrabber":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        errors = 0
+        while not self._stop.is_set():
+            out = None
+            if self.grab_into and self._frames is not None:
+                out = self._reserve()
+            try:
+                frame = self.grab() if out is None else self.grab(out=out)
+            except Exception as err:
+                errors += 1
+                with self._lock:
+                    self._read_errors += 1
+                if errors >= self.max_read_errors:
+                    logger.error(f"{self.name}:Stopping capture after error: {err}")
+                    self.error = err
+                    break
+                continue
+            timestamp = time.monotonic()
+            errors = 0
+            self._store(frame, timestamp, out)
+            if self.on_frame is not None:
+                self.on_frame()
+        self._stop.set()
+        with self._new_frame:
+            self._new_frame.notify_all()
+        if self.on_frame is not None:
+            self.on_frame()
+
+    def _reserve(self) -> np.ndarray:
+        with self._lock:
+            # free the slot about to be written so readers never see it half written
+            if self._head - self._tail == self.buffer_size:
+                self._tail += 1
+                self._overruns += 1
+        return self._frames[self._head % self.buffer_size]
+
+    def _store(
+        self, frame: np.ndarray, timestamp: float, out: typing.Optional[np.ndarray]
+    ) -> None:
+        if self._frames is None:
+            self._frames = np.empty((self.buffer_size,) + frame.shape, frame.dtype)
+        if out is None:
+            out = self._reserve()
+        if frame is not out:
+            np.copyto(out, frame)
+
+        with self._new_frame:
+            if self._head > 0 and self.fps:
+                interval = (
+                    timestamp - self._timestamps[(self._head - 1) % self.buffer_size]
+                )
+                self._dropped += max(int(round(interval * self.fps)) - 1, 0)
+            self._timestamps[self._head % self.buffer_size] = timestamp
+            self._head += 1
+            self._new_frame.notify_all()
+
+    def _frame(self, index: int) -> TimestampedFrame:
+        slot = index % self.buffer_size
+        return TimestampedFrame(
+            self._frames[slot].copy(), float(self._timestamps[slot]), index
+        )
+
+    def latest(
+        self, wait: bool = False, timeout: typing.Optional[float] = None
+    ) -> typing.Optional[TimestampedFrame]:
+        """
+        Returns the most recent frame, leaving the ring untouched
+        :param wait: Block until a frame newer than the last returned one arrives
+        :param timeout: Maximum time to wait in seconds, None to wait indefinitely
+        :return: Copy of the newest frame, None if there is none (yet)
+        """
+        with self._new_frame:
+            if wait:
+                self._new_frame.wait_for(
+                    lambda: self._head - 1 > self._latest_read or self._stop.is_set(),
+                    timeout,
+                )
+            if self._head == 0:
+                return None
+            self._latest_read = self._head - 1
+            return self._frame(self._head - 1)
+
+    def drain(self) -> typing.List[TimestampedFrame]:
+        """
+        Returns all unread frames, oldest first, and marks them as read
+        :return: List of frame copies
+        """
+        with self._lock:
+            frames = [self._frame(i) for i in range(self._tail, self._head)]
+            self._tail = self._head
+            if frames:
+                self._latest_read = self._head - 1
+        return frames
+
+    def stats(self) -> GrabberStats:
+        with self._lock:
+            count = min(self._head, self.buffer_size)
+            fps = 0.0
+            if count > 1:
+                newest = self._timestamps[(self._head - 1) % self.buffer_size]
+                oldest = self._timestamps[(self._head - count) % self.buffer_size]
+                if newest > oldest:
+                    fps = float((count - 1) / (newest - oldest))
+            return GrabberStats(
+                grabbed=self._head,
+                dropped=self._dropped,
+                overruns=self._overruns,
+                read_errors=self._read_errors,
+                fps=fps,
+            )
+
+
+__all__ = ["FrameGrabber", "GrabberStats", "TimestampedFrame"]
@@ -0,0 +1,75 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+# This source code is licensed under the license found in the LICENSE file in the root directory of this source tree.
+
+import typing
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+# number of counterclockwise quarter turns for each cv2.rotate code
+_QUARTER_TURNS = {
+    cv2.ROTATE_90_COUNTERCLOCKWISE: 1,
+    cv2.ROTATE_180: 2,
+    cv2.ROTATE_90_CLOCKWISE: 3,
+}
+
+
+@dataclass(frozen=True)
+class Orientation:
+    """
+    Describes how a raw sensor frame maps to the upright frame, so that the
+    rotation can be applied lazily, fused with other work or skipped
+    """
+
+    # cv2.rotate code, None when the raw frame is already upright
+    rotate_code: typing.Optional[int] = None
+
+    @property
+    def quarter_turns(self) -> int:
+        """
+        :return: Counterclockwise quarter turns, for np.rot90 or torch.rot90 over (H, W)
+        """
+        return _QUARTER_TURNS.get(self.rotate_code, 0)
+
+    def shape(self, raw_shape: typing.Tuple[int, ...]) -> typing.Tuple[int, ...]:
+        """
+        :param raw_shape: Shape of the raw (H, W, ...) frame
+        :return: Shape of the upright frame
+        """
+        if self.quarter_turns % 2:
+            return (raw_shape[1], raw_shape[0]) + tuple(raw_shape[2:])
+        return tuple(raw_shape)
+
+    def apply(
+        self, frame: np.ndarray, out: typing.Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Rotates the frame upright in a single pass
+        :param frame: Raw frame
+        :param out: Reusable output buffer with the upright shape, allocated if None
+        :return: Upright frame, out if given
+        """
+        if self.rotate_code is None:
+            if out is None:
+                return frame
+            np.copyto(out, frame)
+            return out
+        return cv2.rotate(frame, self.rotate_code, out)
+
+    def view(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Returns the upright frame as a strided view of the raw frame, without copying
+        :param frame: Raw frame
+        :return: Upright view
+        """
+        return np.rot90(frame, self.quarter_turns)
+
+
+# raw output of the image sensor, WxH
+RAW = Orientation()
+# upright frame of sensors mounted like the DIGIT: a transpose followed by a vertical flip
+ROTATE_COUNTERCLOCKWISE = Orientation(cv2.ROTATE_90_COUNTERCLOCKWISE)
+
+
+__all__ = ["Orientation", "RAW", "ROTATE_COUNTERCLOCKWISE"]
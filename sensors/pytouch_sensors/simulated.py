@@ -0,0 +1,151 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+# This source code is licensed under the license found in the LICENSE file in the root directory of this source tree.
+
+import time
+import typing
+import zlib
+
+import cv2
+import numpy as np
+
+from pytouch_sensors.orientation import ROTATE_COUNTERCLOCKWISE, Orientation
+
+
+class FakeVideoCapture:
+    """
+    Stand-in for cv2.VideoCapture that produces synthetic frames at a fixed rate.
+
+    Like a camera driver it only keeps the newest frame: a read blocks until the
+    next frame is due, and frames that became due while nobody was reading are
+    lost. Frames are (height, width, 3) uint8 images with the frame number
+    written into the first pixel.
+    """
+
+    def __init__(
+        self,
+        resolution: typing.Tuple[int, int] = (320, 240),
+        fps: float = 60,
+        fail_after: typing.Optional[int] = None,
+        seed: int = 0,
+    ) -> None:
+        """
+        :param resolution: Frame width and height
+        :param fps: Frame rate, 0 to return frames as fast as they are read
+        :param fail_after: Number of successful reads before every read fails
+        :param seed: Seed of the random frame content
+        """
+        self.resolution = resolution
+        self.fps = fps
+        self.fail_after = fail_after
+        self.frames_read = 0
+        self._rng = np.random.default_rng(seed)
+        self._frame = self._rng.integers(
+            0, 256, (resolution[1], resolution[0], 3), np.uint8
+        )
+        self._opened = True
+        self._start = None
+        self._last = -1
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def release(self) -> None:
+        self._opened = False
+
+    def get(self, parameter: int) -> float:
+        if parameter == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.resolution[0])
+        if parameter == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.resolution[1])
+        if parameter == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def set(self, parameter: int, value: float) -> bool:
+        if parameter == cv2.CAP_PROP_FRAME_WIDTH:
+            self.resolution = (int(value), self.resolution[1])
+        elif parameter == cv2.CAP_PROP_FRAME_HEIGHT:
+            self.resolution = (self.resolution[0], int(value))
+        elif parameter == cv2.CAP_PROP_FPS:
+            self.fps = value
+        else:
+            return True
+        self._frame = self._rng.integers(
+            0, 256, (self.resolution[1], self.resolution[0], 3), np.uint8
+        )
+        return True
+
+    def _next_frame_number(self) -> int:
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now
+        if not self.fps:
+            self._last += 1
+            return self._last
+        number = max(int((now - self._start) * self.fps), self._last + 1)
+        time.sleep(max(self._start + number / self.fps - now, 0))
+        self._last = number
+        return number
+
+    def read(
+        self, image: typing.Optional[np.ndarray] = None
+    ) -> typing.Tuple[bool, typing.Optional[np.ndarray]]:
+        if not self._opened or (
+            self.fail_after is not None and self.frames_read >= self.fail_after
+        ):
+            return False, None
+        number = self._next_frame_number()
+        if image is None or image.shape != self._frame.shape:
+            image = self._frame.copy()
+        else:
+            np.copyto(image, self._frame)
+        image[0, 0] = (number & 0xFF, (number >> 8) & 0xFF, (number >> 16) & 0xFF)
+        self.frames_read += 1
+        return True, image
+
+
+class SimulatedSensor:
+    """
+    Sensor with the Digit frame API backed by a FakeVideoCapture, used to test
+    capture code without hardware
+    """
+
+    def __init__(
+        self,
+        serial: str,
+        name: typing.Optional[str] = None,
+        resolution: typing.Tuple[int, int] = (320, 240),
+        fps: float = 60,
+        fail_after: typing.Optional[int] = None,
+    ) -> None:
+        self.serial = serial
+        self.name = name
+        self.resolution = resolution
+        self.fps = fps
+        self.dev = FakeVideoCapture(
+            resolution, fps, fail_after, seed=zlib.crc32(serial.encode())
+        )
+
+    def get_frame(
+        self, transpose: bool = False, out: typing.Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        ret, frame = self.dev.read(out if transpose else None)
+        if not ret:
+            raise Exception(f"Unable to grab frame from {self.serial}!")
+        if not transpose:
+            frame = ROTATE_COUNTERCLOCKWISE.apply(frame, out)
+        return frame
+
+    def get_raw_frame(
+        self, out: typing.Optional[np.ndarray] = None
+    ) -> typing.Tuple[np.ndarray, Orientation]:
+        return self.get_frame(True, out), ROTATE_COUNTERCLOCKWISE
+
+    def disconnect(self) -> None:
+        self.dev.release()
+
+    def __repr__(self) -> str:
+        return f"SimulatedSensor(serial={self.serial}, name={self.name})"
+
+
+__all__ = ["FakeVideoCapture", "SimulatedSensor"]
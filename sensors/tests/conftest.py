@@ -0,0 +1,7 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import os
+import sys
+
+# run against the sources so the tests work without installing pytouch_sensors
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,121 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import importlib
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from pytouch_sensors import FrameGrabber
+from pytouch_sensors.digit import Digit
+from pytouch_sensors.simulated import FakeVideoCapture
+
+
+def read_frames(capture):
+    def grab():
+        ret, frame = capture.read()
+        if not ret:
+            raise IOError("read failed")
+        return frame
+
+    return grab
+
+
+def frame_number(frame):
+    return int(frame[0, 0, 0]) | int(frame[0, 0, 1]) << 8 | int(frame[0, 0, 2]) << 16
+
+
+def test_ring_buffer_overruns():
+    capture = FakeVideoCapture(fps=0)
+    with FrameGrabber(read_frames(capture), buffer_size=4) as grabber:
+        while grabber.stats().grabbed < 20:
+            time.sleep(0.001)
+        frames = grabber.drain()
+        stats = grabber.stats()
+
+    assert 0 < len(frames) <= 4
+    indices = [f.index for f in frames]
+    assert indices == list(range(indices[0], indices[0] + len(frames)))
+    assert all(frame_number(f.frame) == f.index for f in frames)
+    assert [f.timestamp for f in frames] == sorted(f.timestamp for f in frames)
+    # nothing was read before, so every older frame was overwritten
+    assert stats.overruns >= frames[0].index > 0
+    # frames handed out are copies, not views into the ring
+    assert not np.shares_memory(frames[0].frame, grabber._frames)
+
+
+def test_latest_frame():
+    capture = FakeVideoCapture(fps=200)
+    with FrameGrabber(read_frames(capture), buffer_size=3, fps=200) as grabber:
+        first = grabber.latest(wait=True, timeout=5)
+        second = grabber.latest(wait=True, timeout=5)
+        assert second.index > first.index
+        assert second.timestamp > first.timestamp
+        assert grabber.drain()[-1].index >= second.index
+        assert grabber.stats().fps > 0
+
+
+def test_dropped_frames():
+    capture = FakeVideoCapture(fps=100)
+    grab = read_frames(capture)
+
+    def slow_grab():
+        # reading 3x slower than the device delivers, so frames are lost in between
+        time.sleep(0.03)
+        return grab()
+
+    with FrameGrabber(slow_grab, fps=100) as grabber:
+        while grabber.stats().grabbed < 6:
+            time.sleep(0.01)
+    stats = grabber.stats()
+    assert stats.dropped >= stats.grabbed
+    assert stats.overruns == 0
+
+
+def test_read_errors_stop_capture():
+    capture = FakeVideoCapture(fps=0, fail_after=3)
+    grabber = FrameGrabber(read_frames(capture), max_read_errors=2).start()
+    assert grabber.latest(wait=True, timeout=5) is not None
+    grabber._thread.join(5)
+    assert not grabber.is_running
+    assert isinstance(grabber.error, IOError)
+    stats = grabber.stats()
+    assert (stats.grabbed, stats.read_errors) == (3, 2)
+    # waiting on a stopped grabber returns immediately
+    assert grabber.latest(wait=True).index == 2
+    grabber.stop()
+
+
+def test_digit_background_capture(monkeypatch):
+    digit_module = importlib.import_module("pytouch_sensors.digit.digit")
+    device = {
+        "dev_name": "/dev/video0",
+        "manufacturer": "Fake",
+        "model": "DIGIT",
+        "revision": "200",
+        "serial": "D00000",
+    }
+    monkeypatch.setattr(digit_module, "find", lambda serial: device)
+    monkeypatch.setattr(cv2, "VideoCapture", lambda dev_name: FakeVideoCapture(fps=0))
+
+    digit = Digit("D00000")
+    digit.connect()
+    expected_shape = digit.get_frame().shape
+    assert expected_shape == (320, 240, 3)
+
+    with pytest.raises(Exception):
+        digit.drain_frames()
+    digit.start_capture(buffer_size=4)
+    assert digit.get_frame().shape == expected_shape
+    assert digit.get_latest_frame(wait=True).frame.shape == expected_shape
+    assert digit.capture_stats().grabbed > 0
+
+    # capture stopped without an error before any frame was grabbed
+    grabber = digit.start_capture(buffer_size=4)
+    monkeypatch.setattr(grabber, "latest", lambda wait=False, timeout=None: None)
+    with pytest.raises(Exception, match="stopped without a frame"):
+        digit.get_frame()
+    digit.disconnect()
+    with pytest.raises(Exception):
+        digit.get_latest_frame()
@@ -0,0 +1,98 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import importlib
+
+import cv2
+import numpy as np
+import pytest
+
+from pytouch_sensors import FrameGrabber
+from pytouch_sensors.digit import Digit
+from pytouch_sensors.gelsight import GelsightMini
+from pytouch_sensors.orientation import RAW, ROTATE_COUNTERCLOCKWISE, Orientation
+from pytouch_sensors.simulated import FakeVideoCapture
+
+
+def legacy_orientation(frame):
+    frame = cv2.transpose(frame, frame)
+    return cv2.flip(frame, 0)
+
+
+@pytest.mark.parametrize(
+    "code",
+    [None, cv2.ROTATE_90_CLOCKWISE, cv2.ROTATE_180, cv2.ROTATE_90_COUNTERCLOCKWISE],
+)
+def test_orientation(code):
+    frame = np.random.default_rng(0).integers(0, 256, (240, 320, 3), np.uint8)
+    orientation = Orientation(code)
+    upright = orientation.apply(frame)
+    assert upright.shape == orientation.shape(frame.shape)
+    np.testing.assert_array_equal(orientation.view(frame), upright)
+
+    out = np.empty(upright.shape, np.uint8)
+    assert orientation.apply(frame, out) is out
+    np.testing.assert_array_equal(out, upright)
+
+
+def test_sensor_orientation():
+    frame = np.random.default_rng(0).integers(0, 256, (240, 320, 3), np.uint8)
+    expected = legacy_orientation(frame.copy())
+    np.testing.assert_array_equal(ROTATE_COUNTERCLOCKWISE.apply(frame), expected)
+    assert RAW.apply(frame) is frame
+
+
+@pytest.fixture
+def fake_capture(monkeypatch):
+    digit_module = importlib.import_module("pytouch_sensors.digit.digit")
+    device = {
+        "dev_name": "/dev/video0",
+        "manufacturer": "Fake",
+        "model": "DIGIT",
+        "revision": "200",
+        "serial": "D00000",
+    }
+    monkeypatch.setattr(digit_module, "find", lambda serial: device)
+    monkeypatch.setattr(cv2, "VideoCapture", lambda dev_name: FakeVideoCapture(fps=0))
+
+
+@pytest.mark.parametrize("sensor_class", [Digit, GelsightMini])
+def test_get_frame_out(fake_capture, sensor_class):
+    if sensor_class is Digit:
+        sensor = Digit("D00000")
+    else:
+        sensor = GelsightMini("GS0000", device_id="/dev/video0")
+    sensor.connect()
+
+    raw, orientation = sensor.get_raw_frame()
+    assert raw.shape == (240, 320, 3)
+    assert orientation == ROTATE_COUNTERCLOCKWISE
+
+    out = np.empty((320, 240, 3), np.uint8)
+    frame = sensor.get_frame(out=out)
+    assert frame is out
+    raw = sensor.get_frame(transpose=True)
+    # consecutive frames only differ in the stamped frame number
+    raw[0, 0] = frame[-1, 0]
+    np.testing.assert_array_equal(frame, legacy_orientation(raw))
+
+    raw_out = np.empty((240, 320, 3), np.uint8)
+    assert sensor.get_raw_frame(out=raw_out)[0] is raw_out
+    assert sensor.get_frame().shape == (320, 240, 3)
+    sensor.disconnect()
+
+
+def test_grab_into_ring():
+    capture = FakeVideoCapture(fps=0)
+    buffers = []
+
+    def grab(out=None):
+        buffers.append(out)
+        return capture.read(out)[1]
+
+    with FrameGrabber(grab, buffer_size=3, grab_into=True) as grabber:
+        frames = [grabber.latest(wait=True, timeout=5) for _ in range(5)]
+    # the first frame sizes the ring, every later one is read straight into it
+    assert buffers[0] is None
+    assert all(np.shares_memory(out, grabber._frames) for out in buffers[1:])
+    for frame in frames:
+        assert frame.frame[0, 0, 0] == frame.index % 256
@@ -0,0 +1,56 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import pytest
+
+from pytouch_sensors import SensorArray
+from pytouch_sensors.simulated import SimulatedSensor
+
+
+def test_synchronized_framesets():
+    sensors = [SimulatedSensor(f"D0000{i}", fps=60) for i in range(3)]
+    sensors.append(SimulatedSensor("D00003", name="slow", fps=30))
+    array = SensorArray(sensors)
+    assert array.names == ["D00000", "D00001", "D00002", "slow"]
+    assert array.tolerance == pytest.approx(0.5 / 60)
+
+    with array:
+        framesets = [array.read(timeout=5) for _ in range(10)]
+
+    for frameset in framesets:
+        assert set(frameset.frames) == set(array.names)
+        assert frameset["slow"].frame.shape == (320, 240, 3)
+        assert frameset.skew <= 2 * array.tolerance
+        for frame in frameset.frames.values():
+            assert abs(frame.timestamp - frameset.timestamp) <= array.tolerance
+    timestamps = [frameset.timestamp for frameset in framesets]
+    assert timestamps == sorted(timestamps)
+    # each frame is delivered at most once
+    indices = [frameset["slow"].index for frameset in framesets]
+    assert len(set(indices)) == len(indices)
+
+    stats = array.stats()
+    assert stats["slow"].matched == 10
+    assert stats["slow"].fps == pytest.approx(30, rel=0.5)
+    assert stats["D00000"].fps == pytest.approx(60, rel=0.5)
+    # the 60 fps sensors have a frame per slow frame without a partner
+    assert stats["D00000"].unmatched > 0
+    assert 0 <= stats["slow"].offset_mean <= array.tolerance
+    assert 0 < stats["slow"].latency_mean <= stats["slow"].latency_max
+
+
+def test_unmatched_frames():
+    sensors = {"left": SimulatedSensor("D00000"), "right": SimulatedSensor("D00001")}
+    with SensorArray(sensors, tolerance=0) as array:
+        assert array.read(timeout=0.2) is None
+    assert array.stats()["left"].unmatched > 0
+    assert array.stats()["left"].matched == 0
+
+
+def test_device_failure():
+    sensors = [SimulatedSensor("D00000"), SimulatedSensor("D00001", fail_after=2)]
+    with SensorArray(sensors, buffer_size=4) as array:
+        with pytest.raises(IOError):
+            list(array)
+        assert not array.is_running
+    array.disconnect()
+    assert not sensors[0].dev.isOpened()
@@ -0,0 +1,158 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import cv2
+import numpy as np
+import pytest
+
+from pytouch.tasks import ContactArea
+
+
+def _frames(n_frames=6, resolution=(240, 320)):
+    rng = np.random.default_rng(0)
+    height, width = resolution
+    base = rng.integers(90, 110, (height, width, 3)).astype(np.uint8)
+    frames = np.repeat(base[None], n_frames, axis=0)
+    for i, frame in enumerate(frames[1:], start=1):
+        center = (width // 2 + 4 * i, height // 2)
+        cv2.ellipse(frame, center, (40, 25), 15 * i, 0, 360, (200, 180, 170), -1)
+    return base, frames
+
+
+def test_batch_matches_per_frame():
+    base, frames = _frames()
+    contact_area = ContactArea(base=base, draw_poly=False, real_time=True)
+    output = contact_area.batch(frames)
+
+    assert output.major_axis.shape == (len(frames), 2)
+    for i, frame in enumerate(frames):
+        expected = contact_area(frame.copy())
+        if expected is None:
+            assert output.no_contact[i]
+            assert np.isnan(output.major_axis[i]).all()
+            continue
+        (major_axis, major_axis_end), (minor_axis, minor_axis_end) = expected
+        assert not output.no_contact[i]
+        np.testing.assert_allclose(output.major_axis[i], major_axis)
+        np.testing.assert_allclose(output.major_axis_end[i], major_axis_end)
+        np.testing.assert_allclose(output.minor_axis[i], minor_axis)
+        np.testing.assert_allclose(output.minor_axis_end[i], minor_axis_end)
+    assert output.no_contact[0]
+
+
+def test_batch_requires_stack():
+    base, frames = _frames()
+    with pytest.raises(ValueError):
+        ContactArea(base=base).batch(frames[0])
+
+
+@pytest.mark.parametrize("resolution", [(240, 320), (480, 640)])
+def test_box_smooth_matches_filter2d(resolution):
+    diff = np.random.default_rng(0).random(resolution)
+    box = ContactArea(smooth="box")._smooth(diff)
+    dense = ContactArea(smooth="filter2d")._smooth(diff)
+    np.testing.assert_allclose(box, dense, atol=1e-9)
+
+
+def test_diff_uses_cached_base():
+    base, frames = _frames()
+    contact_area = ContactArea(base=base)
+    assert contact_area._base_f32.dtype == np.float32
+
+    diff = (frames[1] * 1.0 - base) / 255.0
+    diff[diff < 0] *= 0.7
+    expected = np.mean(np.abs(diff), axis=-1)
+    np.testing.assert_allclose(contact_area._diff(frames[1], base), expected, atol=1e-6)
+
+    contact_area.base = frames[1]
+    np.testing.assert_array_equal(contact_area._base_f32, frames[1])
+    assert not contact_area._diff(frames[1], contact_area.base).any()
+
+
+def test_uint8_diff_matches_float_diff():
+    base, _ = _frames()
+    frame = np.random.default_rng(1).integers(0, 256, base.shape).astype(np.uint8)
+    contact_area = ContactArea(base=base)
+    out = (
+        np.empty(base.shape, np.uint8),
+        np.empty(base.shape, np.float32),
+        np.empty(base.shape[:2], np.float32),
+    )
+    diff = contact_area._diff_uint8(frame, base, out)
+    assert diff is out[-1]
+    np.testing.assert_allclose(diff, contact_area._diff(frame, base), atol=1e-6)
+
+
+def test_contact_record_and_timings():
+    base, frames = _frames()
+    contact_area = ContactArea(base=base)
+    frame = frames[2].copy()
+    contact = contact_area.contact(frame)
+
+    np.testing.assert_array_equal(frame, frames[2])
+    assert contact.area > 0
+    np.testing.assert_allclose(
+        contact.centroid, (contact.major_axis + contact.major_axis_end) / 2
+    )
+    assert contact.polygon.shape[-1] == 2
+    assert contact_area.timed_frames == 1
+    assert set(contact_area.stage_timings()) == set(ContactArea.STAGES)
+
+    with pytest.raises(Exception):
+        contact_area.contact(frames[0])
+
+
+@pytest.mark.parametrize("angle", [0, 30, 75, 120, 160])
+def test_orientation_and_area_match_contacts(angle):
+    base, _ = _frames()
+    frame = base.copy()
+    cv2.ellipse(frame, (160, 120), (50, 25), angle, 0, 360, (200, 180, 170), -1)
+    contact = ContactArea(base=base).contact(frame)
+    contacts = ContactArea(base=base).contacts(frame)
+
+    def angle_diff(a, b):
+        # orientations of an axis are only defined up to pi
+        return abs((a - b + np.pi / 2) % np.pi - np.pi / 2)
+
+    dx, dy = contact.major_axis - contact.centroid
+    assert angle_diff(contact.orientation, np.arctan2(dy, dx)) < 1e-6
+    assert angle_diff(contact.orientation, np.radians(angle)) < np.radians(2)
+    assert angle_diff(contact.orientation, contacts.orientation[0]) < np.radians(2)
+    assert -np.pi / 2 <= contact.orientation <= np.pi / 2
+    assert contact.area == contacts.area[0]
+
+
+def test_tracking_matches_full_scan():
+    base, frames = _frames(n_frames=8)
+    full = ContactArea(base=base, real_time=True)
+    tracked = ContactArea(base=base, real_time=True, tracking=True)
+    for frame in frames:
+        expected, contact = full.contact(frame), tracked.contact(frame)
+        if expected is None:
+            assert contact is None
+            continue
+        np.testing.assert_allclose(contact.centroid, expected.centroid)
+        np.testing.assert_allclose(contact.major_axis, expected.major_axis)
+        assert contact.area == expected.area
+    assert tracked.tracked_frames > 0
+
+    tracked.base = frames[1]
+    assert tracked._track_box is None
+
+
+def test_contacts_sorted_by_area():
+    base, _ = _frames()
+    frame = base.copy()
+    ellipses = [((240, 50), (22, 18)), ((80, 80), (50, 25)), ((230, 160), (35, 30))]
+    for center, axes in ellipses:
+        cv2.ellipse(frame, center, axes, 0, 0, 360, (200, 180, 170), -1)
+
+    contacts = ContactArea(base=base).contacts(frame)
+    assert len(contacts) == 3
+    assert np.all(np.diff(contacts.area) <= 0)
+    np.testing.assert_allclose(contacts.centroid[0], (80, 80), atol=2)
+    assert np.all(contacts.axes[:, 0] >= contacts.axes[:, 1])
+    np.testing.assert_allclose(
+        contacts.centroid, (contacts.major_axis + contacts.major_axis_end) / 2
+    )
+
+    assert len(ContactArea(base=base).contacts(base)) == 0
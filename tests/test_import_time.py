@@ -0,0 +1,47 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import subprocess
+import sys
+
+import pytest
+
+# backends pytouch must only load when the feature using them is first used
+LAZY_MODULES = ("boto3", "botocore", "onnx", "onnxruntime", "open3d", "scipy")
+# pytouch's own import time on top of its core dependencies, generous enough for
+# slow CI machines while still catching a heavy module being imported eagerly
+IMPORT_BUDGET_MS = 1000
+
+
+def run_python(code, *args):
+    out = subprocess.run(
+        [sys.executable, *args, "-c", code], capture_output=True, text=True, check=True
+    )
+    return out.stdout, out.stderr
+
+
+def test_import_does_not_load_optional_backends():
+    stdout, _ = run_python(
+        "import sys, pytouch\n"
+        "print(' '.join(sorted({m.split('.')[0] for m in sys.modules})))"
+    )
+    loaded = set(stdout.split()) & set(LAZY_MODULES)
+    assert not loaded, f"import pytouch loaded {sorted(loaded)}"
+
+
+def test_lazy_attributes_resolve():
+    pytest.importorskip("open3d", exc_type=ImportError)
+    stdout, _ = run_python(
+        "import sys, pytouch\n"
+        "assert 'open3d' not in sys.modules\n"
+        "print(pytouch.common.Visualizer3D.__module__, 'open3d' in sys.modules)"
+    )
+    assert stdout.split() == ["pytouch.common.visualizer", "True"]
+
+
+def test_import_time_budget():
+    _, stderr = run_python(
+        "import numpy, cv2, PIL, torch, torchvision\nimport pytouch", "-X", "importtime"
+    )
+    (line,) = [line for line in stderr.splitlines() if line.endswith("| pytouch")]
+    cumulative_ms = int(line.split("|")[1]) / 1e3
+    assert cumulative_ms < IMPORT_BUDGET_MS
@@ -0,0 +1,87 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import threading
+import time
+
+import pytest
+import torch
+
+from pytouch.models import ModelKey, ModelRegistry
+from pytouch.models.touch_detect import TouchDetectModel
+from pytouch.sensors import DigitSensor
+from pytouch.tasks import TouchDetect
+
+
+def test_lru_eviction():
+    registry = ModelRegistry(max_models=2)
+    models = {name: registry.get(ModelKey(name, "s"), object) for name in "abc"}
+    assert ModelKey("a", "s") not in registry
+    assert registry.get(ModelKey("c", "s"), object) is models["c"]
+
+    stats = registry.stats()
+    assert (stats.models, stats.hits, stats.misses, stats.evictions) == (2, 1, 3, 1)
+
+
+def test_memory_accounting():
+    registry = ModelRegistry(max_models=None, max_bytes=6000)
+    for name in "ab":
+        registry.get(ModelKey(name, "s"), lambda: torch.nn.Linear(20, 50))
+    # 50 x 20 weights and 50 biases in float32
+    assert registry.stats().nbytes == 4200
+    assert len(registry) == 1
+
+
+def test_concurrent_get_loads_once():
+    registry = ModelRegistry()
+    loads = []
+
+    def factory():
+        loads.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(registry.get(ModelKey("a", "s"), factory))
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_failed_load_is_retried():
+    registry = ModelRegistry()
+
+    def failing_factory():
+        raise IOError("download failed")
+
+    with pytest.raises(IOError):
+        registry.get(ModelKey("a", "s"), failing_factory)
+    assert not registry._loading
+    assert ModelKey("a", "s") not in registry
+    model = registry.get(ModelKey("a", "s"), object)
+    assert registry.get(ModelKey("a", "s"), object) is model
+
+
+def test_tasks_share_zoo_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(torch.hub, "_hub_dir", str(tmp_path))
+    # a checkpoint already in the hub cache is loaded without the network
+    (tmp_path / "checkpoints").mkdir()
+    torch.save(
+        TouchDetectModel()._model.state_dict(),
+        tmp_path / "checkpoints" / "touchdetect_resnet_DigitSensor.pth",
+    )
+    registry = ModelRegistry()
+    first = TouchDetect(DigitSensor, registry=registry)
+    second = TouchDetect(DigitSensor, registry=registry)
+    unshared = TouchDetect(DigitSensor, registry=None)
+
+    assert first.model is second.model
+    assert unshared.model is not first.model
+    assert registry.stats().nbytes == first.model.nbytes > 0
@@ -0,0 +1,55 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import numpy as np
+import pytest
+import torch
+
+from pytouch.models import SlipDetectModel
+from pytouch.tasks import SlipDetect
+
+
+@pytest.fixture(scope="module")
+def checkpoint(tmp_path_factory):
+    torch.manual_seed(0)
+    model_path = tmp_path_factory.mktemp("slip_detect") / "model.pth"
+    torch.save(SlipDetectModel()._model.state_dict(), model_path)
+    return str(model_path)
+
+
+@pytest.fixture(scope="module")
+def clips():
+    torch.manual_seed(1)
+    return torch.randn(3, 3, 4, 64, 64)
+
+
+def test_predict_clips(checkpoint, clips):
+    slip_detect = SlipDetect(checkpoint_path=checkpoint)
+    predictions, certainties = slip_detect(clips)
+    assert predictions.shape == certainties.shape == (len(clips),)
+
+    prediction, certainty = slip_detect(clips[0])
+    assert prediction[0] == predictions[0]
+    assert certainty[0] == pytest.approx(certainties[0], abs=1e-5)
+    with pytest.raises(ValueError):
+        slip_detect(clips[0, :, 0])
+
+
+def test_onnxruntime_backend_matches_torch(checkpoint, clips, tmp_path):
+    slip_detect = SlipDetect(checkpoint_path=checkpoint)
+    onnx_path = str(tmp_path / "model.onnx")
+    torch.onnx.export(
+        slip_detect.model._model,
+        clips[:1],
+        onnx_path,
+        input_names=["input"],
+        output_names=["output"],
+        dynamic_axes={"input": {0: "batch_size"}, "output": {0: "batch_size"}},
+    )
+    onnx_detect = SlipDetect(
+        checkpoint_path=onnx_path, backend="onnxruntime", num_threads=1
+    )
+
+    predictions, certainties = onnx_detect(clips)
+    expected = slip_detect(clips)
+    np.testing.assert_array_equal(predictions, expected[0])
+    np.testing.assert_allclose(certainties, expected[1], atol=1e-5)
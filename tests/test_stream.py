@@ -0,0 +1,131 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import asyncio
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import pytouch.handlers
+from pytouch.handlers import (
+    FrameStream,
+    ImageFolderHandler,
+    VideoHandler,
+    stream_frames,
+)
+
+
+class CountingSource:
+    def __init__(self, count, fail_after=None, delay=0.0):
+        self.count = count
+        self.fail_after = fail_after
+        self.delay = delay
+        self.reads = 0
+
+    def get_frame(self):
+        time.sleep(self.delay)
+        if self.fail_after is not None and self.reads >= self.fail_after:
+            raise IOError("Could not read next frame.")
+        self.reads += 1
+        return self.reads - 1 if self.reads <= self.count else None
+
+
+async def consume(frames, delay=0.0, limit=None):
+    received = []
+    async with frames:
+        async for frame in frames:
+            received.append(frame)
+            await asyncio.sleep(delay)
+            if limit is not None and len(received) == limit:
+                break
+    return received
+
+
+def test_stream_module_not_shadowed():
+    assert pytouch.handlers.stream.stream_frames is stream_frames
+
+
+def test_block_keeps_every_frame():
+    frames = stream_frames(CountingSource(20), policy="block", buffer_size=2)
+    assert asyncio.run(consume(frames, delay=0.002)) == list(range(20))
+    assert (frames.frames_read, frames.dropped) == (20, 0)
+
+
+@pytest.mark.parametrize("policy", ["drop_oldest", "latest_only"])
+def test_dropping_policies(policy):
+    frames = stream_frames(CountingSource(50), policy=policy, buffer_size=4)
+    received = asyncio.run(consume(frames, delay=0.01))
+    assert received == sorted(received)
+    # the newest frame is never dropped
+    assert received[-1] == 49
+    assert frames.dropped > 0
+    assert frames.dropped + len(received) == 50
+    if policy == "latest_only":
+        assert frames.buffer_size == 1
+
+
+def test_read_error_and_early_close():
+    frames = stream_frames(CountingSource(10, fail_after=3), policy="block")
+    received = []
+
+    async def run():
+        async for frame in frames:
+            received.append(frame)
+
+    with pytest.raises(IOError):
+        asyncio.run(run())
+    assert received == [0, 1, 2]
+
+    source = CountingSource(1000, delay=0.001)
+    frames = stream_frames(source)
+    assert len(asyncio.run(consume(frames, limit=3))) == 3
+    reads = source.reads
+    time.sleep(0.05)
+    assert source.reads <= reads + 1
+    assert frames._executor is None
+
+    with pytest.raises(NotImplementedError):
+        FrameStream(source.get_frame, policy="drop_newest")
+
+
+def test_break_stops_reader():
+    source = CountingSource(1000, delay=0.001)
+    frames = stream_frames(source)
+
+    async def run():
+        async for _ in frames:
+            break
+        # the loop closes the abandoned iterator on its next iteration
+        await asyncio.sleep(0.01)
+        reads = source.reads
+        await asyncio.sleep(0.05)
+        return reads
+
+    reads = asyncio.run(run())
+    assert source.reads <= reads + 1
+    assert frames._executor is None
+
+
+def test_video_and_image_folder_streams(tmp_path):
+    images = [np.full((24, 32, 3), 10 * i, np.uint8) for i in range(6)]
+    video_path = str(tmp_path / "video.avi")
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (32, 24))
+    for image in images:
+        writer.write(image)
+    writer.release()
+    for i, image in enumerate(images):
+        cv2.imwrite(str(tmp_path / f"{i:02d}.png"), image)
+
+    video = VideoHandler(video_path)
+    received = asyncio.run(consume(video.stream()))
+    assert [position for _, position in received] == list(range(1, 7))
+    assert received[0][0].shape == (24, 32, 3)
+
+    folder = ImageFolderHandler(str(tmp_path))
+    assert len(folder) == 6
+    received = asyncio.run(consume(folder.stream(buffer_size=1)))
+    for frame, image in zip(received, images):
+        np.testing.assert_array_equal(frame, image)
+    with pytest.raises(IOError):
+        folder.get_frame()
@@ -0,0 +1,202 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import scipy.fft
+import torch
+
+from pytouch.models import ModelRegistry, Pix2PixModel
+from pytouch.models.pix2pix.thirdparty.poisson import PoissonSolver
+from pytouch.sensors import DigitSensor
+from pytouch.tasks import Surface3D
+from pytouch.tasks.surface3d import geometry
+from pytouch.tasks.surface3d.poisson import TorchPoissonSolver, dst_matrix
+from pytouch.tasks.surface_3d import Surface3DModelDefaults
+
+SENSOR_PARAMS = SimpleNamespace(
+    max_depth=0.0198,
+    remove_background_depth=False,
+    T_cam_offset_sim=[
+        [2.22e-16, 2.22e-16, -1.0, 0.0],
+        [-1.0, 0.0, -2.22e-16, 0.0],
+        [0.0, 1.0, 2.22e-16, 1.5e-02],
+        [0.0, 0.0, 0.0, 1.0],
+    ],
+    P=[
+        [2.30940108, 0.0, 0.0, 0.0],
+        [0.0, 1.73205081, 0.0, 0.0],
+        [0.0, 0.0, -1.04081633, -2.04081633e-03],
+        [0.0, 0.0, -1.0, 0.0],
+    ],
+    z_near=0.001,
+    z_far=0.05,
+    gel_width=0.02,
+    gel_height=0.03,
+)
+
+
+@pytest.fixture(scope="module")
+def surface_3d(tmp_path_factory):
+    torch.manual_seed(0)
+    defaults = Surface3DModelDefaults
+    model = Pix2PixModel(
+        defaults.name, defaults.model_type, defaults.dataset_mode, defaults.direction
+    )
+    model_dir = tmp_path_factory.mktemp("surface_3d")
+    (model_dir / defaults.name).mkdir()
+    torch.save(
+        model.model.netG.state_dict(), model_dir / defaults.name / "latest_net_G.pth"
+    )
+    surface_3d = Surface3D("digit", SENSOR_PARAMS, model_path=str(model_dir))
+    # dropout is the only source of randomness in the generator
+    for m in surface_3d.model.model.netG.modules():
+        if isinstance(m, torch.nn.Dropout):
+            m.eval()
+    return surface_3d
+
+
+@pytest.fixture(scope="module")
+def images():
+    torch.manual_seed(1)
+    return torch.rand(3, 3, 240, 320)
+
+
+def test_batch_point_clouds_match_single(surface_3d, images):
+    results = surface_3d.batch_point_clouds(images, chunk_size=2)
+    assert len(results) == len(images)
+    for image, result in zip(images, results):
+        expected = surface_3d.point_cloud_3d(image)
+        np.testing.assert_allclose(result.normal, expected.normal, atol=1e-5)
+        np.testing.assert_allclose(result.depth, expected.depth, atol=1e-6)
+        assert result.points_3d.shape == expected.points_3d.shape
+
+
+def test_stage_timings(surface_3d, images):
+    surface_3d.reset_timings()
+    surface_3d.point_cloud_3d(images[0])
+    timings = surface_3d.stage_timings()
+    assert set(timings) == set(Surface3D.STAGES)
+    assert all(t > 0 for t in timings.values())
+
+
+def test_poisson_solver_batch_matches_single():
+    rng = np.random.default_rng(0)
+    grady, gradx, boundary = rng.normal(size=(3, 4, 40, 30))
+    solver = PoissonSolver()
+    batch = solver.solve(grady, gradx, boundary)
+    for i in range(len(batch)):
+        np.testing.assert_allclose(
+            batch[i], solver.solve(grady[i], gradx[i], boundary[i]), atol=1e-12
+        )
+    assert list(solver._denoms) == [(40, 30)]
+
+
+def test_dst_matrix_matches_scipy():
+    x = np.random.default_rng(0).normal(size=(5, 17))
+    expected = scipy.fft.dst(x, norm="ortho")
+    np.testing.assert_allclose(x @ dst_matrix(17).numpy().T, expected, atol=1e-12)
+
+
+@pytest.mark.parametrize("with_boundary", [False, True])
+def test_torch_poisson_matches_scipy(with_boundary):
+    rng = np.random.default_rng(0)
+    grady, gradx, boundary = rng.normal(size=(3, 4, 40, 30))
+    boundary = boundary if with_boundary else None
+    expected = PoissonSolver().solve(grady, gradx, boundary)
+    result = TorchPoissonSolver().solve(
+        torch.from_numpy(grady),
+        torch.from_numpy(gradx),
+        None if boundary is None else torch.from_numpy(boundary),
+    )
+    np.testing.assert_allclose(result.numpy(), expected, atol=1e-10)
+    result_f32 = TorchPoissonSolver().solve(
+        torch.from_numpy(grady).float(), torch.from_numpy(gradx).float()
+    )
+    np.testing.assert_allclose(
+        result_f32.numpy(), PoissonSolver().solve(grady, gradx), atol=1e-4
+    )
+
+
+def test_projector_matches_per_pixel_transforms():
+    torch.manual_seed(0)
+    depth = 0.015 + 0.005 * torch.rand(2, 16, 12, dtype=torch.float64)
+    P = torch.tensor(SENSOR_PARAMS.P, dtype=torch.float64)
+    V = torch.tensor(SENSOR_PARAMS.T_cam_offset_sim, dtype=torch.float64)
+    projector = geometry.Projector(16, 12, P, V, SENSOR_PARAMS, dtype=torch.float64)
+    points = projector(depth, ordered_pts=True)
+    assert points.shape == (2, 3, 16, 12)
+
+    for frame, frame_points in zip(depth, points):
+        pixel_pos = geometry._vectorize_pixel_coords(rows=16, cols=12)
+        clip_pos = geometry._pixel_to_clip(pixel_pos, frame, SENSOR_PARAMS)
+        world_pos = geometry._eye_to_world(geometry._clip_to_eye(clip_pos, P), V)
+        x, y = pixel_pos
+        torch.testing.assert_close(frame_points[:, y, x], world_pos[0:3])
+
+
+def test_unproject_caches_projectors_by_matrix_values(surface_3d):
+    surface_3d._projectors.clear()
+    depth = torch.full((8, 6), 0.015)
+    V = np.array(SENSOR_PARAMS.T_cam_offset_sim)
+    points = surface_3d.unproject(depth, V, SENSOR_PARAMS.P, ordered_pts=True)
+    surface_3d.unproject(depth, V.copy(), np.array(SENSOR_PARAMS.P))
+    assert len(surface_3d._projectors) == 1
+
+    V[2, 3] += 0.01
+    moved = surface_3d.unproject(depth, V, SENSOR_PARAMS.P, ordered_pts=True)
+    assert len(surface_3d._projectors) == 2
+    assert not torch.allclose(moved, points)
+
+    for rows in range(2, 2 + Surface3D.MAX_PROJECTORS):
+        surface_3d.unproject(torch.full((rows, 6), 0.015), V, SENSOR_PARAMS.P)
+    assert len(surface_3d._projectors) == Surface3D.MAX_PROJECTORS
+
+
+def _outlier_points_map():
+    torch.manual_seed(0)
+    y, x = torch.meshgrid(
+        torch.linspace(-1, 1, 40), torch.linspace(-1, 1, 30), indexing="ij"
+    )
+    z = 0.02 - 0.004 * torch.clamp(1 - (x**2 + y**2) * 4, min=0)
+    points_map = torch.stack([x * 0.01, y * 0.015, z + 1e-5 * torch.randn(40, 30)])
+    points_map[2, [5, 17, 33], [3, 20, 11]] += 0.01
+    return points_map
+
+
+def test_grid_outlier_mask():
+    points_map = _outlier_points_map()
+    mask = geometry.grid_outlier_mask(points_map, std_ratio=2.0)
+    assert (~mask).nonzero().tolist() == [[5, 3], [17, 20], [33, 11]]
+
+    batch_mask = geometry.grid_outlier_mask(
+        torch.stack([points_map] * 2), std_ratio=2.0
+    )
+    assert torch.equal(batch_mask, torch.stack([mask] * 2))
+
+
+def test_grid_outlier_removal_matches_open3d():
+    pytest.importorskip("open3d", exc_type=ImportError)
+    points_map = _outlier_points_map()
+    expected = geometry.remove_outlier_pts(points_map.flatten(1), std_ratio=2.0)
+    torch.testing.assert_close(
+        geometry.remove_outlier_pts_grid(points_map, std_ratio=2.0),
+        expected.to(points_map.dtype),
+    )
+
+
+def test_registry_key_includes_model_params(monkeypatch):
+    monkeypatch.setattr(Surface3D, "_load_model", lambda self, *args: object())
+    registry = ModelRegistry()
+    models = [
+        Surface3D(DigitSensor, SENSOR_PARAMS, model_params=params, registry=registry)
+        for params in (
+            Surface3DModelDefaults,
+            Surface3DModelDefaults(direction="BtoA"),
+            Surface3DModelDefaults(),
+        )
+    ]
+    assert len(registry) == 2
+    assert models[0].model is models[2].model
+    assert models[0].model is not models[1].model
@@ -0,0 +1,209 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import inspect
+
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+from pytouch.models import ModelRegistry, PyTouchZoo
+from pytouch.models.touch_detect import (
+    QuantizedTouchDetectModel,
+    TouchDetectModel,
+    TouchDetectModelDefaults,
+)
+from pytouch.sensors import DigitSensor
+from pytouch.tasks import TouchDetect
+from pytouch.utils.transforms import FastFrameTransform
+
+
+@pytest.fixture(scope="module")
+def touch_detect(tmp_path_factory):
+    torch.manual_seed(0)
+    model_path = tmp_path_factory.mktemp("touch_detect") / "model.pth"
+    torch.save(TouchDetectModel()._model.state_dict(), model_path)
+    return TouchDetect(DigitSensor, model_path=str(model_path))
+
+
+@pytest.fixture(scope="module")
+def frames():
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (240, 320, 3), dtype=np.uint8) for _ in range(5)]
+
+
+def test_predict_batch_matches_single(touch_detect, frames):
+    predictions, certainties = touch_detect.predict_batch(frames, max_batch_size=2)
+    assert predictions.shape == certainties.shape == (len(frames),)
+    for frame, prediction, certainty in zip(frames, predictions, certainties):
+        expected, expected_certainty = touch_detect(touch_detect.process_batch([frame]))
+        assert prediction == expected
+        assert certainty == pytest.approx(float(expected_certainty), abs=1e-5)
+
+
+def test_predict_batch_tensor(touch_detect, frames):
+    frames_t = touch_detect.process_batch(frames)
+    predictions, certainties = touch_detect.predict_batch(frames_t)
+    expected = touch_detect.predict_batch(frames, max_batch_size=1)
+    np.testing.assert_array_equal(predictions, expected[0])
+    np.testing.assert_allclose(certainties, expected[1], atol=1e-5)
+
+
+def test_predict_batch_empty(touch_detect, frames):
+    expected = touch_detect.predict_batch(frames[:1])
+    for empty in ([], torch.empty(0, 3, 64, 64)):
+        predictions, certainties = touch_detect.predict_batch(empty)
+        assert predictions.shape == certainties.shape == (0,)
+        assert predictions.dtype == expected[0].dtype
+        assert certainties.dtype == expected[1].dtype
+
+
+def test_process_returns_new_tensors(touch_detect, frames):
+    first = touch_detect.process(frames[0])
+    expected = first.clone()
+    second = touch_detect.process(frames[1])
+    batch = touch_detect.process_batch(frames[2:])
+    touch_detect.predict_batch(frames)
+    touch_detect.is_touching(frames[3])
+    assert first.data_ptr() not in (second.data_ptr(), batch.data_ptr())
+    torch.testing.assert_close(first, expected, atol=0, rtol=0)
+
+
+def test_fast_preprocess_matches_torchvision(touch_detect):
+    # frames already at the model scale skip resizing, so both paths must agree
+    frame = np.random.default_rng(1).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    fast = touch_detect.process(frame)
+    reference = touch_detect.transform(Image.fromarray(frame)).unsqueeze(0)
+    torch.testing.assert_close(fast, reference, atol=1e-5, rtol=0)
+
+    bgr = FastFrameTransform(
+        TouchDetectModelDefaults.SCALES,
+        TouchDetectModelDefaults.MEANS,
+        TouchDetectModelDefaults.STDS,
+        bgr=True,
+    )
+    torch.testing.assert_close(bgr(frame[..., ::-1].copy()), fast, atol=1e-5, rtol=0)
+
+
+def test_onnxruntime_backend_matches_torch(touch_detect, frames, tmp_path):
+    onnx_path = str(tmp_path / "model.onnx")
+    torch.onnx.export(
+        touch_detect.model._model,
+        torch.randn(1, 3, 64, 64),
+        onnx_path,
+        input_names=["input"],
+        output_names=["output"],
+        dynamic_axes={"input": {0: "batch_size"}, "output": {0: "batch_size"}},
+    )
+    onnx_detect = TouchDetect(
+        DigitSensor, model_path=onnx_path, backend="onnxruntime", num_threads=1
+    )
+    assert onnx_detect.model.session.get_session_options().intra_op_num_threads == 1
+
+    frames_t = touch_detect.process_batch(frames)
+    predictions, certainties = onnx_detect.predict_batch(frames_t)
+    expected = touch_detect.predict_batch(frames_t)
+    np.testing.assert_array_equal(predictions, expected[0])
+    np.testing.assert_allclose(certainties, expected[1], atol=1e-5)
+
+
+def test_onnxruntime_fixed_batch_pads_last_chunk(touch_detect, frames, tmp_path):
+    onnx_path = str(tmp_path / "model_fixed.onnx")
+    torch.onnx.export(
+        touch_detect.model._model,
+        torch.randn(3, 3, 64, 64),
+        onnx_path,
+        input_names=["input"],
+        output_names=["output"],
+    )
+    onnx_detect = TouchDetect(
+        DigitSensor, model_path=onnx_path, backend="onnxruntime", num_threads=1
+    )
+    assert onnx_detect.model.fixed_batch_size == 3
+
+    frames_t = touch_detect.process_batch(frames)
+    assert len(frames_t) % 3
+    predictions, certainties = onnx_detect.predict_batch(frames_t)
+    expected = touch_detect.predict_batch(frames_t)
+    np.testing.assert_array_equal(predictions, expected[0])
+    np.testing.assert_allclose(certainties, expected[1], atol=1e-5)
+
+
+@pytest.mark.parametrize("mode", QuantizedTouchDetectModel.MODES)
+def test_quantized_model(touch_detect, frames, mode):
+    quantized = QuantizedTouchDetectModel(
+        state_dict=touch_detect.model._model.state_dict(), mode=mode
+    )
+    frames_t = touch_detect.process_batch(frames)
+    if mode == "static":
+        with pytest.raises(AssertionError):
+            quantized(frames_t)
+        quantized.calibrate([frames_t])
+
+    with torch.no_grad():
+        output = torch.softmax(quantized(frames_t), dim=1)
+        expected = torch.softmax(touch_detect.model(frames_t), dim=1)
+    assert output.shape == expected.shape
+    agreement = (output.argmax(dim=1) == expected.argmax(dim=1)).float().mean()
+    assert agreement >= 0.8
+    torch.testing.assert_close(output, expected, atol=0.05, rtol=0)
+
+
+def test_quantized_engine_is_restored(touch_detect, frames):
+    engines = torch.backends.quantized.supported_engines
+    previous = torch.backends.quantized.engine
+    engine = next((e for e in engines if e not in (previous, "none")), None)
+    if engine is None:
+        pytest.skip("needs a second quantized engine")
+    quantized = QuantizedTouchDetectModel(
+        state_dict=touch_detect.model._model.state_dict(), mode="static", engine=engine
+    )
+    quantized.calibrate([touch_detect.process_batch(frames)])
+    quantized(touch_detect.process_batch(frames))
+    assert torch.backends.quantized.engine == previous
+
+
+@pytest.mark.skipif(
+    "mmap" not in inspect.signature(torch.load).parameters,
+    reason="memory-mapped weights need torch>=2.1",
+)
+def test_mmap_weights(touch_detect, frames, tmp_path, monkeypatch):
+    monkeypatch.setattr(torch.hub, "_hub_dir", str(tmp_path))
+    mmap_detect = TouchDetect(
+        DigitSensor, model_path=touch_detect.model_path, mmap=True
+    )
+    (mmap_file,) = (tmp_path / "checkpoints" / "mmap").iterdir()
+
+    # the weights are the loaded tensors, not copies of them
+    weight = mmap_detect.model._model.conv1.weight
+    assert weight.data_ptr() == mmap_detect.model.state_dict["conv1.weight"].data_ptr()
+    assert PyTouchZoo.mmap_checkpoint(touch_detect.model_path) == str(mmap_file)
+
+    frames_t = touch_detect.process_batch(frames)
+    predictions, certainties = mmap_detect.predict_batch(frames_t)
+    expected = touch_detect.predict_batch(frames_t)
+    np.testing.assert_array_equal(predictions, expected[0])
+    np.testing.assert_allclose(certainties, expected[1], atol=1e-6)
+
+
+def test_mmap_requires_torch_support(touch_detect, monkeypatch):
+    def old_load(f, map_location=None):
+        raise AssertionError("torch.load must not be reached")
+
+    monkeypatch.setattr(torch, "load", old_load)
+    with pytest.raises(NotImplementedError, match="torch>=2.1"):
+        PyTouchZoo.load_model(touch_detect.model_path, mmap=True)
+    with pytest.raises(NotImplementedError, match="torch>=2.1"):
+        TouchDetectModel(state_dict={}, share_weights=True)
+
+
+def test_registry_key_includes_mmap(monkeypatch):
+    monkeypatch.setattr(TouchDetect, "_load_torch", lambda self, *args: object())
+    registry = ModelRegistry()
+    models = [
+        TouchDetect(DigitSensor, registry=registry, mmap=mmap).model
+        for mmap in (False, True, True)
+    ]
+    assert len(registry) == 2
+    assert models[0] is not models[1]
+    assert models[1] is models[2]
@@ -0,0 +1,188 @@
+# Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
+
+import functools
+import http.server
+import os
+import threading
+
+import pytest
+import torch
+
+from pytouch.models.zoo import (
+    LocalZooBackend,
+    PyTouchZoo,
+    PyTouchZooChecksumError,
+    PyTouchZooModelNotFound,
+)
+from pytouch.sensors import DigitSensor
+
+
+@pytest.fixture
+def zoo_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(torch.hub, "_hub_dir", str(tmp_path / "hub"))
+    zoo_dir = tmp_path / "zoo"
+    zoo_dir.mkdir()
+    torch.save(
+        {"weight": torch.ones(3)}, zoo_dir / "touchdetect_resnet_DigitSensor.pth"
+    )
+    return zoo_dir
+
+
+def count_listings(monkeypatch):
+    calls = []
+    list_objects = LocalZooBackend.list_objects
+
+    def counting_list_objects(self):
+        calls.append(self.root)
+        return list_objects(self)
+
+    monkeypatch.setattr(LocalZooBackend, "list_objects", counting_list_objects)
+    return calls
+
+
+def test_local_zoo_manifest(zoo_dir, monkeypatch):
+    listings = count_listings(monkeypatch)
+    zoo = PyTouchZoo(source=f"file://{zoo_dir}")
+    assert not listings
+
+    assert zoo.list_models() == ["touchdetect_resnet_DigitSensor.pth"]
+    (obj,) = zoo.objects
+    assert obj["Size"] == os.path.getsize(zoo_dir / obj["Key"])
+    assert os.path.exists(zoo.manifest_path)
+
+    # a new zoo reuses the manifest written by the first one
+    zoo = PyTouchZoo(source=str(zoo_dir))
+    state_dict = zoo.load_model_from_zoo("touchdetect_resnet", DigitSensor)
+    assert torch.equal(state_dict["weight"], torch.ones(3))
+    assert len(listings) == 1
+
+    with pytest.raises(PyTouchZooModelNotFound):
+        zoo.load_model_from_zoo("missing", DigitSensor)
+
+
+def test_cached_model_loads_offline(zoo_dir, monkeypatch):
+    zoo = PyTouchZoo(source=str(zoo_dir))
+    zoo.load_model_from_zoo("touchdetect_resnet", DigitSensor)
+
+    def offline(self):
+        raise OSError("zoo unreachable")
+
+    monkeypatch.setattr(LocalZooBackend, "list_objects", offline)
+    zoo = PyTouchZoo(source=str(zoo_dir), manifest_ttl=0)
+    state_dict = zoo.load_model_from_zoo("touchdetect_resnet", DigitSensor)
+    assert torch.equal(state_dict["weight"], torch.ones(3))
+    # an expired manifest is still used when the zoo cannot be reached
+    assert zoo.list_models() == ["touchdetect_resnet_DigitSensor.pth"]
+
+
+def test_manifest_ttl(zoo_dir, monkeypatch):
+    listings = count_listings(monkeypatch)
+    PyTouchZoo(source=str(zoo_dir)).list_models()
+    torch.save({"weight": torch.zeros(3)}, zoo_dir / "touchdetect_resnet_GelSight.pth")
+
+    assert len(PyTouchZoo(source=str(zoo_dir)).list_models()) == 1
+    assert len(PyTouchZoo(source=str(zoo_dir), manifest_ttl=0).list_models()) == 2
+    assert len(listings) == 2
+
+
+class _ZooRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves a directory with S3 style listings and byte range requests"""
+
+    ranges = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/?") or self.path == "/":
+            objects = LocalZooBackend(self.directory).list_objects()
+            contents = "".join(
+                f"<Contents><Key>{o['Key']}</Key><Size>{o['Size']}</Size>"
+                f"<ETag>{o['ETag']}</ETag></Contents>"
+                for o in objects
+            )
+            self._send(200, f"<ListBucketResult>{contents}</ListBucketResult>".encode())
+            return
+        with open(os.path.join(self.directory, self.path.lstrip("/")), "rb") as f:
+            data = f.read()
+        byte_range = self.headers.get("Range")
+        if byte_range is None:
+            self._send(200, data)
+            return
+        self.ranges.append(byte_range)
+        offset = int(byte_range[len("bytes=") : -1])
+        self._send(206, data[offset:])
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def zoo_server(zoo_dir):
+    torch.save({"weight": torch.zeros(3)}, zoo_dir / "touchdetect_resnet_GelSight.pth")
+    (zoo_dir / "touchdetect_resnet_DigitSensor.onnx").write_bytes(os.urandom(4096))
+    handler = functools.partial(_ZooRequestHandler, directory=str(zoo_dir))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_prefetch(zoo_dir, zoo_server):
+    zoo = PyTouchZoo(source=zoo_server)
+    paths = zoo.prefetch(["touchdetect_resnet"], versions=["pth"], max_workers=2)
+    assert sorted(paths) == [
+        "touchdetect_resnet_DigitSensor.pth",
+        "touchdetect_resnet_GelSight.pth",
+    ]
+    for key, path in paths.items():
+        assert open(path, "rb").read() == (zoo_dir / key).read_bytes()
+
+    paths = zoo.prefetch(sensors=[DigitSensor])
+    assert len(paths) == 2
+    assert not [f for f in os.listdir(zoo.checkpoint_dir) if f.endswith(".part")]
+    with pytest.raises(PyTouchZooModelNotFound):
+        zoo.prefetch(["missing"])
+
+
+def test_prefetch_resumes_and_verifies(zoo_dir, zoo_server):
+    zoo = PyTouchZoo(source=zoo_server)
+    key = "touchdetect_resnet_DigitSensor.onnx"
+    data = (zoo_dir / key).read_bytes()
+    cached_file = os.path.join(zoo.checkpoint_dir, key)
+    os.makedirs(zoo.checkpoint_dir)
+
+    # an interrupted download continues where it stopped
+    with open(f"{cached_file}.part", "wb") as f:
+        f.write(data[:1000])
+    _ZooRequestHandler.ranges.clear()
+    (path,) = zoo.prefetch(versions=["onnx"]).values()
+    assert _ZooRequestHandler.ranges == ["bytes=1000-"]
+    assert open(path, "rb").read() == data
+
+    # corrupted cache entries and partial files are downloaded again
+    with open(cached_file, "wb") as f:
+        f.write(b"x" * len(data))
+    with open(f"{cached_file}.part", "wb") as f:
+        f.write(b"x" * 1000)
+    zoo.prefetch(versions=["onnx"])
+    assert open(cached_file, "rb").read() == data
+
+    # the zoo content changed after the manifest was written
+    (zoo_dir / key).write_bytes(os.urandom(len(data)))
+    os.remove(cached_file)
+    with pytest.raises(PyTouchZooChecksumError):
+        zoo.prefetch(versions=["onnx"])
+    assert not os.path.exists(cached_file)
+
+    # a corrupt cache entry is removed even when downloading it again fails
+    with open(cached_file, "wb") as f:
+        f.write(b"x" * len(data))
+    with pytest.raises(PyTouchZooChecksumError):
+        zoo.prefetch(versions=["onnx"])
+    assert not os.path.exists(cached_file)
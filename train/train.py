@@ -72,7 +72,15 @@ def main(cfg):
         )
         input_sample = torch.randn(1, 3, 64, 64)
         onnx_filename = os.path.basename(checkpoint_callback.best_model_path)
-        best_model.to_onnx(onnx_filename, input_sample, export_params=True)
+        # dynamic batch axis so onnxruntime backends can run batched inference
+        best_model.to_onnx(
+            onnx_filename,
+            input_sample,
+            export_params=True,
+            input_names=["input"],
+            output_names=["output"],
+            dynamic_axes={"input": {0: "batch_size"}, "output": {0: "batch_size"}},
+        )
 
 
 if __name__ == "__main__":